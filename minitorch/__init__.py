@@ -4,6 +4,9 @@ from .testing import MathTest, MathTestVariable  # type: ignore # noqa: F401,F40
 from .tensor_data import *  # noqa: F401,F403
 from .tensor import *  # noqa: F401,F403
 from .tensor_ops import *  # noqa: F401,F403
+from .numpy_ops import NumpyBackend, NumpyOps  # noqa: F401
+from .fast_ops import FastOps, FastTensorBackend  # noqa: F401
+from .process_ops import ProcessBackend, ProcessOps  # noqa: F401
 from .tensor_functions import *  # noqa: F401,F403
 from .datasets import *  # noqa: F401,F403
 from .optim import *  # noqa: F401,F403
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
 from typing import Any, Iterable, Tuple, Protocol
 
 import collections
@@ -114,12 +113,14 @@ def backpropagate(variable: Variable, deriv: Any) -> None:
                 diffs[v.unique_id] += d
 
 
-@dataclass
 class Context:
     """Context class is used by `Function` to store information during the forward pass."""
 
-    no_grad: bool = False
-    saved_values: Tuple[Any, ...] = ()
+    __slots__ = ("no_grad", "saved_values")
+
+    def __init__(self, no_grad: bool = False, saved_values: Tuple[Any, ...] = ()):
+        self.no_grad = no_grad
+        self.saved_values = saved_values
 
     def save_for_backward(self, *values: Any) -> None:
         """Store the given `values` if they need to be used during backpropagation."""
@@ -0,0 +1,669 @@
+from __future__ import annotations
+
+import functools
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, TypeVar
+
+import numpy as np
+from numba import njit as _njit
+from numba import prange
+
+from . import fusion
+from .tensor_data import (
+    broadcast_index,
+    broadcast_strides,
+    coalesce,
+    index_to_position,
+    result_dtype,
+    shape_broadcast,
+    storage_dtype,
+    to_index,
+)
+from .tensor_ops import (
+    PAIRWISE_BLOCK,
+    DtypeRule,
+    MapProto,
+    ReduceProto,
+    ScalarProto,
+    SimpleOps,
+    TensorBackend,
+    TensorOps,
+    ZipProto,
+    check_summation,
+    matrix_multiply_op,
+)
+
+if TYPE_CHECKING:
+    from .tensor import Tensor
+    from .tensor_data import Shape, Storage, Strides
+
+# JIT compiled versions of the tensor_data index helpers. Anything called
+# from inside a kernel must stay within what NUMBA's nopython mode allows.
+Fn = TypeVar("Fn")
+
+
+def njit(fn: Fn, **kwargs: Any) -> Fn:
+    """JIT compile `fn`, inlining it into any compiled caller."""
+    return _njit(inline="always", **kwargs)(fn)  # type: ignore
+
+
+to_index = njit(to_index)
+index_to_position = njit(index_to_position)
+broadcast_index = njit(broadcast_index)
+
+
+def compile_fn(fn: Fn) -> Fn:
+    """JIT compile a scalar function from `operators` for use in a kernel.
+
+    The function is not inlined at the NUMBA IR level: several operators
+    `assert` on their domain, and an inlined `assert` adds a second exit to
+    the `prange` loop, which makes NUMBA fall back to a serial loop. LLVM
+    still inlines the call when it is profitable.
+
+    Fused functions are rebuilt on compiled operators first, so the whole
+    expression becomes one compiled function.
+    """
+    if fusion.is_fused(fn):
+        fn = fusion.specialize(fn, compile_fn)  # type: ignore
+    return _njit(fn)  # type: ignore
+
+
+# Storage dtypes NUMBA compiles kernels for. Tensors of other dtypes
+# (float16) run the Python kernels of `SimpleOps` instead.
+NUMBA_DTYPES = frozenset(
+    np.dtype(t) for t in (np.float64, np.float32, np.int32, np.bool_)
+)
+
+
+def fused_kernel(
+    fn: Callable[..., float],
+    kernel: Callable[[Callable[..., Any]], Callable[..., None]],
+) -> Callable[..., None]:
+    """`kernel(compile_fn(fn))`, sharing compiled code between fused functions.
+
+    A fused `fn` is split into a template and its constants (see
+    `fusion.lift_constants`). The template is compiled once with `kernel`,
+    which must pass an extra last argument through to it, and the constants
+    are appended to every call. Chains differing only in a constant, such
+    as `x * 0.5` and `x * 0.25`, then run the same machine code.
+    """
+    template, values = fusion.lift_constants(fn)
+    f = _compiled_template(template, kernel)
+    constants = np.array(values, dtype=np.float64)
+
+    def call(*args: Any) -> None:
+        f(*args, constants)
+
+    return call
+
+
+@functools.lru_cache(maxsize=fusion.KERNEL_CACHE_SIZE)
+def _compiled_template(
+    template: Callable[..., Any], kernel: Callable[[Callable[..., Any]], Any]
+) -> Callable[..., None]:
+    return kernel(compile_fn(template))
+
+
+def compiles(*tensors: Optional[Tensor]) -> bool:
+    """True if the compiled kernels handle the dtypes of all `tensors`."""
+    return all(t is None or t.dtype in NUMBA_DTYPES for t in tensors)
+
+
+def coalesced(out: Tensor, *inputs: Tensor) -> List[Any]:
+    """Kernel arguments for `out` and `inputs` over a coalesced loop nest.
+
+    Every operand gets the same (simplified) shape and its broadcast
+    strides, see `tensor_data.coalesce`. Contiguous operands collapse to a
+    single dimension, which lets the kernels take their aligned fast path.
+    """
+    shape, *strides = coalesce(
+        tuple(out.shape),
+        out._tensor.strides,
+        *(broadcast_strides(out.shape, t.shape, t._tensor.strides) for t in inputs),
+    )
+    kernel_shape = np.array(shape)
+    args: List[Any] = []
+    for t, st in zip((out, *inputs), strides):
+        args += [t._tensor.storage, kernel_shape, np.array(st)]
+    return args
+
+
+class FastOps(TensorOps):
+    @staticmethod
+    def map(
+        fn: Callable[[float], float], out_dtype: DtypeRule = storage_dtype
+    ) -> MapProto:
+        """See `tensor_ops.py`"""
+        if fusion.is_fused(fn):
+            f = fused_kernel(fn, tensor_map_scalar)
+        else:
+            f = tensor_map(compile_fn(fn))
+        simple = SimpleOps.map(fn, out_dtype)
+
+        def ret(a: Tensor, out: Optional[Tensor] = None) -> Tensor:
+            if not compiles(a, out):
+                return simple(a, out)
+            if out is None:
+                out = a.zeros(a.shape, out_dtype(a.dtype))
+            f(*coalesced(out, a))
+            return out
+
+        return ret
+
+    @staticmethod
+    def zip(
+        fn: Callable[[float, float], float], out_dtype: DtypeRule = storage_dtype
+    ) -> ZipProto:
+        """See `tensor_ops.py`"""
+        if fusion.is_fused(fn):
+            f = fused_kernel(fn, tensor_zip_scalar)
+        else:
+            f = tensor_zip(compile_fn(fn))
+        simple = SimpleOps.zip(fn, out_dtype)
+
+        def ret(a: Tensor, b: Tensor, out: Optional[Tensor] = None) -> Tensor:
+            if not compiles(a, b, out):
+                return simple(a, b, out)
+            c_shape = shape_broadcast(a.shape, b.shape)
+            if out is None:
+                out = a.zeros(c_shape, out_dtype(result_dtype(a.dtype, b.dtype)))
+            else:
+                assert out.shape == c_shape, f"Cannot write {c_shape} into {out.shape}"
+            f(*coalesced(out, a, b))
+            return out
+
+        return ret
+
+    @staticmethod
+    def zip_scalar(fn: Callable[[float, float], float]) -> ScalarProto:
+        """See `tensor_ops.py`"""
+        f = tensor_map_scalar(compile_fn(fn))
+        simple = SimpleOps.zip_scalar(fn)
+
+        def ret(a: Tensor, c: float, out: Optional[Tensor] = None) -> Tensor:
+            if not compiles(a, out):
+                return simple(a, c, out)
+            if out is None:
+                out = a.zeros(a.shape, result_dtype(a.dtype, c))
+            # Typed like the output, so each dtype compiles one kernel.
+            f(*coalesced(out, a), out.dtype.type(c))
+            return out
+
+        return ret
+
+    @staticmethod
+    def reduce(
+        fn: Callable[[float, float], float],
+        start: float = 0.0,
+        summation: str = "naive",
+        out_dtype: DtypeRule = storage_dtype,
+    ) -> ReduceProto:
+        """See `tensor_ops.py`"""
+        check_summation(fn, summation)
+        f = tensor_reduce(compile_fn(fn), summation)
+        simple = SimpleOps.reduce(fn, start, summation, out_dtype)
+
+        def ret(a: Tensor, dim: int, out: Optional[Tensor] = None) -> Tensor:
+            if not compiles(a, out):
+                return simple(a, dim, out)
+            out_shape = list(a.shape)
+            out_shape[dim] = 1
+
+            # Other values when not sum.
+            if out is None:
+                out = a.zeros(tuple(out_shape), out_dtype(a.dtype))
+                out._tensor._storage[:] = start
+            else:
+                assert out.shape == tuple(out_shape), f"Cannot reduce into {out.shape}"
+                out.fill_(start)
+
+            # Coalesce the kept dimensions and move `dim` to the end.
+            shape, out_strides, a_strides = coalesce(
+                tuple(out.shape), out._tensor.strides, a._tensor.strides
+            )
+            f(
+                out._tensor.storage,
+                np.array(shape + (1,)),
+                np.array(out_strides + (0,)),
+                a._tensor.storage,
+                np.array(shape + (a.shape[dim],)),
+                np.array(a_strides + (a._tensor.strides[dim],)),
+                len(shape),
+            )
+            return out
+
+        return ret
+
+    @staticmethod
+    def matrix_multiply(a: Tensor, b: Tensor) -> Tensor:
+        """See `tensor_ops.py`"""
+        if not compiles(a, b):
+            return SimpleOps.matrix_multiply(a, b)
+        return _fast_matrix_multiply(a, b)
+
+    is_cuda = False
+
+
+# Implementations
+
+
+def tensor_map(
+    fn: Callable[[float], float],
+) -> Callable[[Storage, Shape, Strides, Storage, Shape, Strides], None]:
+    """NUMBA low_level tensor_map function. See `tensor_ops.py` for description.
+
+    The outer loop runs in parallel over output positions.
+
+    Args:
+    ----
+        fn: function mappings floats-to-floats to apply.
+
+    Returns:
+    -------
+        Tensor map function.
+
+    """
+
+    def _map(
+        out: Storage,
+        out_shape: Shape,
+        out_strides: Strides,
+        in_storage: Storage,
+        in_shape: Shape,
+        in_strides: Strides,
+    ) -> None:
+        size = np.prod(out_shape)
+        # Fast path: identical dense layouts, so storage positions line up one
+        # to one.
+        if (
+            len(out) == size
+            and np.array_equal(out_shape, in_shape)
+            and np.array_equal(out_strides, in_strides)
+        ):
+            for i in prange(size):
+                out[i] = fn(in_storage[i])
+            return
+
+        for i in prange(size):
+            out_index = np.empty(len(out_shape), np.int32)
+            in_index = np.empty(len(in_shape), np.int32)
+            to_index(i, out_shape, out_index)
+            broadcast_index(out_index, out_shape, in_shape, in_index)
+            out[index_to_position(out_index, out_strides)] = fn(
+                in_storage[index_to_position(in_index, in_strides)]
+            )
+
+    return njit(_map, parallel=True)  # type: ignore
+
+
+def tensor_map_scalar(
+    fn: Callable[[float, float], float],
+) -> Callable[[Storage, Shape, Strides, Storage, Shape, Strides, Any], None]:
+    """NUMBA tensor_map of `fn(x, c)` for a constant `c` given at call time.
+
+    Args:
+    ----
+        fn: function maps two floats to float to apply.
+
+    Returns:
+    -------
+        Tensor map function taking `c` as its last argument.
+
+    """
+
+    def _map(
+        out: Storage,
+        out_shape: Shape,
+        out_strides: Strides,
+        in_storage: Storage,
+        in_shape: Shape,
+        in_strides: Strides,
+        c: Any,
+    ) -> None:
+        size = np.prod(out_shape)
+        if (
+            len(out) == size
+            and np.array_equal(out_shape, in_shape)
+            and np.array_equal(out_strides, in_strides)
+        ):
+            for i in prange(size):
+                out[i] = fn(in_storage[i], c)
+            return
+
+        for i in prange(size):
+            out_index = np.empty(len(out_shape), np.int32)
+            in_index = np.empty(len(in_shape), np.int32)
+            to_index(i, out_shape, out_index)
+            broadcast_index(out_index, out_shape, in_shape, in_index)
+            out[index_to_position(out_index, out_strides)] = fn(
+                in_storage[index_to_position(in_index, in_strides)], c
+            )
+
+    return njit(_map, parallel=True)  # type: ignore
+
+
+def tensor_zip(
+    fn: Callable[[float, float], float],
+) -> Callable[
+    [Storage, Shape, Strides, Storage, Shape, Strides, Storage, Shape, Strides], None
+]:
+    """NUMBA higher-order tensor zip function. See `tensor_ops.py` for description.
+
+    The outer loop runs in parallel over output positions.
+
+    Args:
+    ----
+        fn: function maps two floats to float to apply.
+
+    Returns:
+    -------
+        Tensor zip function.
+
+    """
+
+    def _zip(
+        out: Storage,
+        out_shape: Shape,
+        out_strides: Strides,
+        a_storage: Storage,
+        a_shape: Shape,
+        a_strides: Strides,
+        b_storage: Storage,
+        b_shape: Shape,
+        b_strides: Strides,
+    ) -> None:
+        size = np.prod(out_shape)
+        # Fast path: identical dense layouts, so storage positions line up one
+        # to one.
+        if (
+            len(out) == size
+            and np.array_equal(out_shape, a_shape)
+            and np.array_equal(out_shape, b_shape)
+            and np.array_equal(out_strides, a_strides)
+            and np.array_equal(out_strides, b_strides)
+        ):
+            for i in prange(size):
+                out[i] = fn(a_storage[i], b_storage[i])
+            return
+
+        for i in prange(size):
+            out_index = np.empty(len(out_shape), np.int32)
+            a_index = np.empty(len(a_shape), np.int32)
+            b_index = np.empty(len(b_shape), np.int32)
+            to_index(i, out_shape, out_index)
+            broadcast_index(out_index, out_shape, a_shape, a_index)
+            broadcast_index(out_index, out_shape, b_shape, b_index)
+            out[index_to_position(out_index, out_strides)] = fn(
+                a_storage[index_to_position(a_index, a_strides)],
+                b_storage[index_to_position(b_index, b_strides)],
+            )
+
+    return njit(_zip, parallel=True)  # type: ignore
+
+
+def tensor_zip_scalar(
+    fn: Callable[[float, float, Any], float],
+) -> Callable[..., None]:
+    """NUMBA tensor_zip of `fn(x, y, c)` for a constant `c` given at call time.
+
+    Args:
+    ----
+        fn: function of two floats and `c` to apply.
+
+    Returns:
+    -------
+        Tensor zip function taking `c` as its last argument.
+
+    """
+
+    def _zip(
+        out: Storage,
+        out_shape: Shape,
+        out_strides: Strides,
+        a_storage: Storage,
+        a_shape: Shape,
+        a_strides: Strides,
+        b_storage: Storage,
+        b_shape: Shape,
+        b_strides: Strides,
+        c: Any,
+    ) -> None:
+        size = np.prod(out_shape)
+        if (
+            len(out) == size
+            and np.array_equal(out_shape, a_shape)
+            and np.array_equal(out_shape, b_shape)
+            and np.array_equal(out_strides, a_strides)
+            and np.array_equal(out_strides, b_strides)
+        ):
+            for i in prange(size):
+                out[i] = fn(a_storage[i], b_storage[i], c)
+            return
+
+        for i in prange(size):
+            out_index = np.empty(len(out_shape), np.int32)
+            a_index = np.empty(len(a_shape), np.int32)
+            b_index = np.empty(len(b_shape), np.int32)
+            to_index(i, out_shape, out_index)
+            broadcast_index(out_index, out_shape, a_shape, a_index)
+            broadcast_index(out_index, out_shape, b_shape, b_index)
+            out[index_to_position(out_index, out_strides)] = fn(
+                a_storage[index_to_position(a_index, a_strides)],
+                b_storage[index_to_position(b_index, b_strides)],
+                c,
+            )
+
+    return njit(_zip, parallel=True)  # type: ignore
+
+
+def tensor_reduce(
+    fn: Callable[[float, float], float],
+    summation: str = "naive",
+) -> Callable[[Storage, Shape, Strides, Storage, Shape, Strides, int], None]:
+    """NUMBA higher-order tensor reduce function. See `tensor_ops.py` for description.
+
+    The outer loop runs in parallel over output positions; each output
+    walks its slice of `reduce_dim` by stride, so nothing is allocated per
+    element and results are deterministic.
+
+    Args:
+    ----
+        fn: reduction function mapping two floats to float.
+        summation: accumulation scheme when `fn` is `operators.add`,
+            see `tensor_ops.SUMMATIONS`.
+
+    Returns:
+    -------
+        Tensor reduce function
+
+    """
+
+    def _reduce(
+        out: Storage,
+        out_shape: Shape,
+        out_strides: Strides,
+        a_storage: Storage,
+        a_shape: Shape,
+        a_strides: Strides,
+        reduce_dim: int,
+    ) -> None:
+        reduce_size = a_shape[reduce_dim]
+        reduce_stride = a_strides[reduce_dim]
+        for i in prange(np.prod(out_shape)):
+            out_index = np.empty(len(out_shape), np.int32)
+            to_index(i, out_shape, out_index)
+            o = index_to_position(out_index, out_strides)
+            j = index_to_position(out_index, a_strides)
+            acc = out[o]
+            for _ in range(reduce_size):
+                acc = fn(a_storage[j], acc)
+                j += reduce_stride
+            out[o] = acc
+
+    def _pairwise_reduce(
+        out: Storage,
+        out_shape: Shape,
+        out_strides: Strides,
+        a_storage: Storage,
+        a_shape: Shape,
+        a_strides: Strides,
+        reduce_dim: int,
+    ) -> None:
+        reduce_size = a_shape[reduce_dim]
+        reduce_stride = a_strides[reduce_dim]
+        blocks = (reduce_size + PAIRWISE_BLOCK - 1) // PAIRWISE_BLOCK
+        for i in prange(np.prod(out_shape)):
+            out_index = np.empty(len(out_shape), np.int32)
+            to_index(i, out_shape, out_index)
+            o = index_to_position(out_index, out_strides)
+            j = index_to_position(out_index, a_strides)
+
+            # Naive sums of short blocks, then combine neighbours in place.
+            partials = np.zeros(max(blocks, 1))
+            for p in range(reduce_size):
+                partials[p // PAIRWISE_BLOCK] += a_storage[j]
+                j += reduce_stride
+            n = blocks
+            while n > 1:
+                for p in range(n // 2):
+                    partials[p] = partials[2 * p] + partials[2 * p + 1]
+                if n % 2:
+                    partials[n // 2] = partials[n - 1]
+                n = (n + 1) // 2
+            out[o] = out[o] + partials[0]
+
+    def _kahan_reduce(
+        out: Storage,
+        out_shape: Shape,
+        out_strides: Strides,
+        a_storage: Storage,
+        a_shape: Shape,
+        a_strides: Strides,
+        reduce_dim: int,
+    ) -> None:
+        reduce_size = a_shape[reduce_dim]
+        reduce_stride = a_strides[reduce_dim]
+        for i in prange(np.prod(out_shape)):
+            out_index = np.empty(len(out_shape), np.int32)
+            to_index(i, out_shape, out_index)
+            o = index_to_position(out_index, out_strides)
+            j = index_to_position(out_index, a_strides)
+            acc = out[o]
+            c = 0.0
+            for _ in range(reduce_size):
+                x = a_storage[j]
+                t = acc + x
+                if abs(acc) >= abs(x):
+                    c += (acc - t) + x
+                else:
+                    c += (x - t) + acc
+                acc = t
+                j += reduce_stride
+            out[o] = acc + c
+
+    kernels = {
+        "naive": _reduce,
+        "pairwise": _pairwise_reduce,
+        "kahan": _kahan_reduce,
+    }
+    return njit(kernels[summation], parallel=True)  # type: ignore
+
+
+# Edge of the square tiles used by `tensor_matrix_multiply`. Three 32 x 32
+# float64 tiles (24KB) stay resident in L1/L2 while a block is accumulated.
+MATMUL_TILE = 32
+
+
+def _tensor_matrix_multiply(
+    out: Storage,
+    out_shape: Shape,
+    out_strides: Strides,
+    a_storage: Storage,
+    a_shape: Shape,
+    a_strides: Strides,
+    b_storage: Storage,
+    b_shape: Shape,
+    b_strides: Strides,
+) -> None:
+    """NUMBA tensor matrix multiply function. See `tensor_ops.py` for description.
+
+    The work is split into (batch, row tile) pairs that run in parallel.
+    Within a pair the `j` and `k` loops are blocked into `MATMUL_TILE`-sized
+    tiles: each block of `out` is accumulated in a small local buffer while
+    the matching tiles of `a` and `b` stay in cache, and the innermost loop
+    walks a row of `b`.
+
+    Args:
+    ----
+        out (Storage): storage for `out` tensor
+        out_shape (Shape): shape for `out` tensor
+        out_strides (Strides): strides for `out` tensor
+        a_storage (Storage): storage for `a` tensor
+        a_shape (Shape): shape for `a` tensor
+        a_strides (Strides): strides for `a` tensor
+        b_storage (Storage): storage for `b` tensor
+        b_shape (Shape): shape for `b` tensor
+        b_strides (Strides): strides for `b` tensor
+
+    Returns:
+    -------
+        None : Fills in `out`
+
+    """
+    dims = len(out_shape)
+    n, m, k = out_shape[dims - 2], out_shape[dims - 1], a_shape[len(a_shape) - 1]
+    out_batch_shape = out_shape[: dims - 2]
+    a_batch_shape = a_shape[: len(a_shape) - 2]
+    b_batch_shape = b_shape[: len(b_shape) - 2]
+
+    a_row, a_col = a_strides[len(a_shape) - 2], a_strides[len(a_shape) - 1]
+    b_row, b_col = b_strides[len(b_shape) - 2], b_strides[len(b_shape) - 1]
+    o_row, o_col = out_strides[dims - 2], out_strides[dims - 1]
+
+    batches = 1
+    for d in out_batch_shape:
+        batches *= d
+    row_tiles = (n + MATMUL_TILE - 1) // MATMUL_TILE
+
+    for t in prange(batches * row_tiles):
+        batch, i0 = t // row_tiles, (t % row_tiles) * MATMUL_TILE
+        i1 = min(i0 + MATMUL_TILE, n)
+
+        out_index = np.empty(len(out_batch_shape), np.int32)
+        a_index = np.empty(len(a_batch_shape), np.int32)
+        b_index = np.empty(len(b_batch_shape), np.int32)
+        to_index(batch, out_batch_shape, out_index)
+        broadcast_index(out_index, out_batch_shape, a_batch_shape, a_index)
+        broadcast_index(out_index, out_batch_shape, b_batch_shape, b_index)
+        o_base = index_to_position(out_index, out_strides[: dims - 2])
+        a_base = index_to_position(a_index, a_strides[: len(a_shape) - 2])
+        b_base = index_to_position(b_index, b_strides[: len(b_shape) - 2])
+
+        # Accumulate one (row tile x column tile) block of `out` at a time.
+        acc = np.empty((MATMUL_TILE, MATMUL_TILE))
+        for j0 in range(0, m, MATMUL_TILE):
+            w = min(j0 + MATMUL_TILE, m) - j0
+            acc[:, :] = 0.0
+            for p0 in range(0, k, MATMUL_TILE):
+                p1 = min(p0 + MATMUL_TILE, k)
+                for i in range(i0, i1):
+                    a_pos = a_base + i * a_row
+                    for p in range(p0, p1):
+                        av = a_storage[a_pos + p * a_col]
+                        b_pos = b_base + p * b_row + j0 * b_col
+                        # Unit stride lets LLVM vectorize the innermost loop.
+                        if b_col == 1:
+                            for j in range(w):
+                                acc[i - i0, j] += av * b_storage[b_pos + j]
+                        else:
+                            for j in range(w):
+                                acc[i - i0, j] += av * b_storage[b_pos + j * b_col]
+            for i in range(i0, i1):
+                o = o_base + i * o_row + j0 * o_col
+                for j in range(w):
+                    out[o + j * o_col] = acc[i - i0, j]
+
+
+tensor_matrix_multiply = njit(_tensor_matrix_multiply, parallel=True)
+_fast_matrix_multiply = matrix_multiply_op(tensor_matrix_multiply)
+
+FastTensorBackend = TensorBackend(FastOps)
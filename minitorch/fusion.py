@@ -0,0 +1,659 @@
+"""Elementwise fusion of chains of backend maps and zips.
+
+A chain of backend maps and zips such as::
+
+    sig = f.sigmoid_map(x)
+    out = f.mul_zip(f.mul_zip(sig, f.add_zip(one, f.neg_map(sig))), d)
+
+launches one kernel and allocates one temporary per step. The same chain
+can be written as an expression over the kernel's arguments::
+
+    x, d = arg(0), arg(1)
+    sig = call(operators.sigmoid, x)
+    sigmoid_back = fuse(sig * (1.0 - sig) * d, 2)
+
+`fuse` generates one scalar function evaluating the whole expression, with
+shared subexpressions computed once. It can be handed to `ops.map` /
+`ops.zip` like any function from `operators`, so the chain runs as a
+single pass over memory. Backends that do not call scalar functions
+directly rebuild it from the expression with `specialize`.
+
+`lazy` builds these expressions automatically. Its maps and zips return
+tensors whose storage is a `Deferred`, recording the call. The first time
+the storage is read, e.g. by a reduce, a matrix multiply, a view or
+`to_numpy`, the call is run with its deferred inputs inlined, so a chain
+of calls runs as one fused map or zip. Deferred values read by more than
+one call, or saved for backward, are computed once instead of inlined.
+`TensorBackend` uses `lazy` only when built with `fuse=True`.
+
+Deferred values are computed from their inputs when first read, so
+in-place writes (`fill_`, `add_`, ...) first compute the deferred values
+reading the memory they write to, see `flush`. Writes through NumPy
+arrays sharing a tensor's memory (`from_numpy`, `to_numpy`, `load` memory
+maps) bypass this check, and change results that look computed already.
+Each new chain is also a new kernel to build, a compilation for
+`FastOps`. Backends are therefore eager by default; the fused derivative
+zips below give the main gains of fusion without either cost.
+"""
+
+from __future__ import annotations
+
+import functools
+import itertools
+import weakref
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+import numpy as np
+
+from . import operators
+from .tensor_data import TensorData, result_dtype, shape_broadcast, storage_dtype
+
+if TYPE_CHECKING:
+    from .tensor import Tensor
+    from .tensor_data import Storage, UserShape
+    from .tensor_ops import (
+        DtypeRule,
+        MapProto,
+        ReduceProto,
+        ScalarProto,
+        TensorOps,
+        ZipProto,
+    )
+
+ExprLike = Union["Expr", float, int]
+
+# Deferred values take at most this many input tensors, so that they run as
+# a map (one input) or a zip (two inputs).
+MAX_INPUTS = 2
+# Expressions stop growing at this many nodes; larger inputs are computed
+# on their own first.
+MAX_NODES = 64
+# Fused kernels (and templates, see `lift_constants`) kept per backend,
+# keyed on the structure of the expression.
+KERNEL_CACHE_SIZE = 256
+
+
+class Expr:
+    """Node of a lazy elementwise expression.
+
+    A node is either argument `index` of the fused function, a constant
+    `value`, or `fn` applied to the nodes in `args`.
+    """
+
+    def __init__(
+        self,
+        fn: Optional[Callable[..., float]] = None,
+        args: Tuple[Expr, ...] = (),
+        index: Optional[int] = None,
+        value: Optional[float] = None,
+    ):
+        self.fn = fn
+        self.args = args
+        self.index = index
+        self.value = value
+
+    def __add__(self, b: ExprLike) -> Expr:
+        return call(operators.add, self, b)
+
+    def __radd__(self, b: ExprLike) -> Expr:
+        return call(operators.add, b, self)
+
+    def __sub__(self, b: ExprLike) -> Expr:
+        return call(operators.add, self, call(operators.neg, b))
+
+    def __rsub__(self, b: ExprLike) -> Expr:
+        return call(operators.add, b, call(operators.neg, self))
+
+    def __mul__(self, b: ExprLike) -> Expr:
+        return call(operators.mul, self, b)
+
+    def __rmul__(self, b: ExprLike) -> Expr:
+        return call(operators.mul, b, self)
+
+    def __neg__(self) -> Expr:
+        return call(operators.neg, self)
+
+
+def arg(index: int) -> Expr:
+    """Argument `index` of the fused function."""
+    return Expr(index=index)
+
+
+def const(value: float) -> Expr:
+    """A constant."""
+    return Expr(value=float(value))
+
+
+def call(fn: Callable[..., float], *args: ExprLike) -> Expr:
+    """Apply the scalar function `fn` (usually from `operators`) to `args`."""
+    return Expr(fn, tuple(a if isinstance(a, Expr) else const(a) for a in args))
+
+
+def fuse(expr: Expr, nargs: int) -> Callable[..., float]:
+    """Compile `expr` into a scalar function of `nargs` arguments.
+
+    Args:
+    ----
+        expr: expression to evaluate
+        nargs: number of arguments of the function
+
+    Returns:
+    -------
+        Function computing `expr` with the functions of `operators`. The
+        expression is kept on it so backends can `specialize` it.
+
+    """
+    fused = _codegen(expr, nargs, lambda fn: fn)
+    fused.expr = expr  # type: ignore
+    fused.nargs = nargs  # type: ignore
+    return fused
+
+
+def is_fused(fn: Any) -> bool:
+    """True if `fn` was built by `fuse`."""
+    return hasattr(fn, "expr") and hasattr(fn, "nargs")
+
+
+def specialize(
+    fn: Callable[..., float], resolve: Callable[[Callable[..., Any]], Any]
+) -> Callable[..., Any]:
+    """Rebuild a fused function, replacing every scalar function with `resolve(fn)`.
+
+    `NumpyOps` resolves to array functions so the result works on whole
+    arrays; `FastOps` resolves to compiled functions so NUMBA can compile
+    the result.
+
+    Args:
+    ----
+        fn: function returned by `fuse`
+        resolve: maps each scalar function in the expression to its replacement
+
+    Returns:
+    -------
+        Function with the same arguments as `fn`.
+
+    """
+    return _codegen(
+        fn.expr,  # type: ignore
+        fn.nargs,  # type: ignore
+        resolve,
+        getattr(fn, "lifted", False),
+    )
+
+
+def lift_constants(fn: Callable[..., float]) -> Tuple[Callable[..., Any], List[float]]:
+    """Split a fused function into a template and the values of its constants.
+
+    The template takes one more argument, a sequence holding the constants,
+    so fused functions differing only in their constants share a template.
+    `FastOps` compiles each template once and passes the constants at call
+    time, instead of compiling again for every new constant.
+
+    Args:
+    ----
+        fn: function returned by `fuse`
+
+    Returns:
+    -------
+        Template (itself a fused function, accepted by `specialize`) and the
+        constants to call it with.
+
+    """
+    signature = _signature(fn.expr)  # type: ignore
+    values = [entry[1] for entry in signature if entry[0] == "const"]
+    shape = tuple(("const",) if entry[0] == "const" else entry for entry in signature)
+    return _template(shape, fn.nargs), values  # type: ignore
+
+
+@functools.lru_cache(maxsize=KERNEL_CACHE_SIZE)
+def _template(signature: Tuple[Any, ...], nargs: int) -> Callable[..., Any]:
+    expr = _rebuild(signature)
+    template = _codegen(expr, nargs, lambda fn: fn, lifted=True)
+    template.expr = expr  # type: ignore
+    template.nargs = nargs  # type: ignore
+    template.lifted = True  # type: ignore
+    return template
+
+
+def _codegen(
+    expr: Expr,
+    nargs: int,
+    resolve: Callable[[Callable[..., Any]], Any],
+    lifted: bool = False,
+) -> Callable[..., Any]:
+    names: Dict[int, str] = {}
+    fns: Dict[Callable[..., Any], str] = {}
+    namespace: Dict[str, Any] = {}
+    lines: List[str] = []
+    constants = 0
+
+    def visit(node: Expr) -> str:
+        nonlocal constants
+        if id(node) in names:
+            return names[id(node)]
+        if node.index is not None:
+            assert node.index < nargs, f"Argument {node.index} out of {nargs}"
+            name = f"x{node.index}"
+        elif node.fn is None and lifted:
+            name = f"k[{constants}]"
+            constants += 1
+        elif node.fn is None:
+            name = f"c{len(namespace)}"
+            namespace[name] = node.value
+        else:
+            args = [visit(a) for a in node.args]
+            if node.fn not in fns:
+                fns[node.fn] = f"f{len(fns)}"
+                namespace[fns[node.fn]] = resolve(node.fn)
+            name = f"t{len(lines)}"
+            lines.append(f"    {name} = {fns[node.fn]}({', '.join(args)})")
+        names[id(node)] = name
+        return name
+
+    result = visit(expr)
+    params = ", ".join([f"x{i}" for i in range(nargs)] + (["k"] if lifted else []))
+    source = "\n".join([f"def fused({params}):", *lines, f"    return {result}"])
+    exec(compile(source, "<fused>", "exec"), namespace)
+    return namespace["fused"]
+
+
+# Fused derivatives used by `tensor_functions`.
+
+_x, _d = arg(0), arg(1)
+_sig = call(operators.sigmoid, _x)
+
+sigmoid_back = fuse(_sig * (1.0 - _sig) * _d, 2)
+exp_back = fuse(call(operators.exp, _x) * _d, 2)
+
+
+# Lazy capture.
+
+# Deferred values not computed yet.
+_pending: weakref.WeakSet[Deferred] = weakref.WeakSet()
+
+
+class Deferred(TensorData):
+    """Storage of a captured map or zip, computed on first access.
+
+    The value is `fn(*args)`, where `args` are tensors or Python numbers.
+    Shape, strides and dtype are known up front; reading the storage runs
+    `eager(*args, out)`, or a fused kernel when deferred `args` can be
+    inlined, see `_plan`.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[..., float],
+        args: Tuple[Union[Tensor, float], ...],
+        shape: UserShape,
+        dtype: np.dtype,
+        eager: Callable[..., Tensor],
+        fused: Callable[[Expr, Tuple[Tensor, ...], Tensor], None],
+    ):
+        self.args: Optional[Tuple[Union[Tensor, float], ...]] = None
+        super().__init__(_stand_in(dtype, int(operators.prod(shape))), shape)
+        self.fn = fn
+        self.args = args
+        self.eager = eager
+        self.fused = fused
+        # Number of deferred values reading this one, and whether autodiff
+        # saved it for backward. Only values read once are inlined.
+        self.uses = 0
+        self.kept = False
+        for a in args:
+            if _is_pending(a):
+                a._tensor.uses += 1  # type: ignore
+        _pending.add(self)
+
+    @property  # type: ignore
+    def _storage(self) -> Storage:
+        if self.args is not None:
+            self.compute()
+        return self._data
+
+    @_storage.setter
+    def _storage(self, storage: Storage) -> None:
+        self._data = storage
+
+    def pending(self) -> bool:
+        """True until the value is computed."""
+        return self.args is not None
+
+    def inlinable(self) -> bool:
+        """True if the value may be inlined into the one deferred value reading it.
+
+        A kept value is computed again when it is read later, so it is only
+        inlined if that costs a single op: when it has no argument that it
+        would inline itself.
+        """
+        if not self.pending() or self.uses != 1:
+            return False
+        return not self.kept or not any(
+            _is_pending(a) and a._tensor.uses == 1  # type: ignore
+            for a in self.args  # type: ignore
+        )
+
+    def compute(self) -> None:
+        """Run the kernel, replacing the stand-in storage."""
+        assert self.args is not None
+        args = self.args
+        out = next(a for a in args if not isinstance(a, (int, float))).zeros(
+            self.shape, self.dtype
+        )
+        expr, inputs = _plan(self)
+        if expr is None:
+            self.eager(*args, out)
+        else:
+            self.fused(expr, inputs, out)
+        self.args = self.fn = self.eager = self.fused = None  # type: ignore
+        _pending.discard(self)
+        self._data = out._tensor._storage
+
+
+@functools.lru_cache(maxsize=KERNEL_CACHE_SIZE)
+def _stand_in(dtype: np.dtype, size: int) -> Storage:
+    """Read-only storage of `size` zeros taking no memory."""
+    return np.broadcast_to(np.zeros((), dtype), (size,))
+
+
+@functools.lru_cache(maxsize=KERNEL_CACHE_SIZE)
+def _nodes(fn: Callable[..., float]) -> int:
+    return _count(fn.expr) if is_fused(fn) else 1  # type: ignore
+
+
+def _is_pending(a: Union[Tensor, float]) -> bool:
+    return not isinstance(a, (int, float)) and pending(a)
+
+
+def pending(t: Tensor) -> bool:
+    """True if `t` is a deferred value not computed yet."""
+    return isinstance(t._tensor, Deferred) and t._tensor.pending()
+
+
+def keep(*values: Any) -> None:
+    """Mark deferred tensors among `values` as read again later.
+
+    `Function.apply` keeps the values saved for backward, so a chain
+    inlined into them is not computed again by the backward pass, see
+    `Deferred.inlinable`.
+    """
+    for v in values:
+        if isinstance(getattr(v, "_tensor", None), Deferred):
+            v._tensor.kept = True
+
+
+def flush(t: Optional[Tensor] = None) -> None:
+    """Compute the deferred values that read the storage of `t` (default: all).
+
+    Called before `t` is written in place, so values captured earlier see
+    the data as it was when they were captured.
+    """
+    if not _pending:
+        return
+    target = None if t is None else t._tensor._storage
+    for node in list(_pending):
+        if not node.pending():
+            continue
+        if target is None or any(
+            not isinstance(a, (int, float))
+            and not pending(a)
+            and np.may_share_memory(a._tensor._storage, target)
+            for a in node.args  # type: ignore
+        ):
+            node.compute()
+
+
+def _plan(node: Deferred) -> Tuple[Optional[Expr], Tuple[Tensor, ...]]:
+    """Expression computing `node`, inlining its deferred arguments.
+
+    Arguments are inlined recursively, as many as keep the kernel within
+    `MAX_INPUTS` inputs and `MAX_NODES` nodes. Returns `(None, ())` if
+    nothing can be inlined, so `node` runs its eager kernel.
+    """
+    inputs: Dict[int, Tensor] = {}
+    nodes = 0
+
+    def expression(d: Deferred, inline: Tuple[int, ...]) -> Optional[Expr]:
+        """`d` with the arguments at `inline` inlined, None if over the limits."""
+        nonlocal nodes
+        nodes += _nodes(d.fn)
+        if nodes > MAX_NODES:
+            return None
+        exprs: List[Expr] = []
+        for i, a in enumerate(d.args):  # type: ignore
+            if isinstance(a, (int, float)):
+                exprs.append(const(a))
+            elif i in inline:
+                e = best(a._tensor)  # type: ignore
+                if e is None:
+                    return None
+                exprs.append(e)
+            else:
+                inputs.setdefault(id(a._tensor), a)
+                if len(inputs) > MAX_INPUTS:
+                    return None
+                exprs.append(arg(list(inputs).index(id(a._tensor))))
+        if is_fused(d.fn):
+            return _substitute(d.fn.expr, exprs)  # type: ignore
+        return call(d.fn, *exprs)
+
+    def attempt(d: Deferred, options: Iterable[Tuple[int, ...]]) -> Optional[Expr]:
+        nonlocal inputs, nodes
+        for inline in options:
+            saved = dict(inputs), nodes
+            e = expression(d, inline)
+            if e is not None:
+                return e
+            inputs, nodes = saved
+        return None
+
+    def choices(d: Deferred, least: int) -> Iterator[Tuple[int, ...]]:
+        """Sets of arguments of `d` to inline, largest first."""
+        candidates = [
+            i
+            for i, a in enumerate(d.args)  # type: ignore
+            if _is_pending(a) and a._tensor.inlinable()  # type: ignore
+        ]
+        for n in range(len(candidates), least - 1, -1):
+            yield from itertools.combinations(candidates, n)
+
+    def best(d: Deferred) -> Optional[Expr]:
+        return attempt(d, choices(d, 0))
+
+    expr = attempt(node, choices(node, 1))
+    if expr is None:
+        return None, ()
+    return expr, tuple(inputs.values())
+
+
+def _count(expr: Expr) -> int:
+    seen = set()
+
+    def visit(node: Expr) -> None:
+        if id(node) not in seen:
+            seen.add(id(node))
+            for a in node.args:
+                visit(a)
+
+    visit(expr)
+    return len(seen)
+
+
+def _substitute(expr: Expr, args: Sequence[Expr]) -> Expr:
+    """`expr` with argument `i` replaced by `args[i]`, keeping shared nodes shared."""
+    done: Dict[int, Expr] = {}
+
+    def visit(node: Expr) -> Expr:
+        if id(node) not in done:
+            if node.index is not None:
+                done[id(node)] = args[node.index]
+            elif node.fn is None:
+                done[id(node)] = node
+            else:
+                done[id(node)] = Expr(node.fn, tuple(visit(a) for a in node.args))
+        return done[id(node)]
+
+    return visit(expr)
+
+
+def _signature(expr: Expr) -> Tuple[Any, ...]:
+    """Hashable description of `expr`: its nodes in post-order.
+
+    Each entry is ("arg", index), ("const", value) or (fn, *positions of
+    the argument entries). `_rebuild` turns it back into an expression.
+    """
+    positions: Dict[int, int] = {}
+    entries: List[Tuple[Any, ...]] = []
+
+    def visit(node: Expr) -> int:
+        if id(node) not in positions:
+            if node.index is not None:
+                entry: Tuple[Any, ...] = ("arg", node.index)
+            elif node.fn is None:
+                entry = ("const", node.value)
+            else:
+                entry = (node.fn, *(visit(a) for a in node.args))
+            positions[id(node)] = len(entries)
+            entries.append(entry)
+        return positions[id(node)]
+
+    visit(expr)
+    return tuple(entries)
+
+
+def _rebuild(signature: Tuple[Any, ...]) -> Expr:
+    nodes: List[Expr] = []
+    for tag, *rest in signature:
+        if tag == "arg":
+            nodes.append(arg(rest[0]))
+        elif tag == "const":
+            nodes.append(const(rest[0] if rest else 0.0))
+        else:
+            nodes.append(Expr(tag, tuple(nodes[i] for i in rest)))
+    return nodes[-1]
+
+
+def _fusable(dtype: np.dtype, *inputs: Tensor) -> bool:
+    """Fused kernels skip the rounding of intermediate values to their dtype,
+    so only chains of a single floating dtype are captured.
+    """
+    return dtype.kind == "f" and all(t.dtype == dtype for t in inputs)
+
+
+def _defer(
+    fn: Callable[..., float],
+    args: Tuple[Union[Tensor, float], ...],
+    shape: UserShape,
+    dtype: np.dtype,
+    eager: Callable[..., Tensor],
+    fused: Callable[[Expr, Tuple[Tensor, ...], Tensor], None],
+) -> Tensor:
+    """Tensor holding `fn(*args)` as a `Deferred`."""
+    node = Deferred(fn, args, shape, dtype, eager, fused)
+    return next(a for a in args if not isinstance(a, (int, float)))._new(node)
+
+
+@functools.lru_cache(maxsize=None)
+def lazy(ops: Type[TensorOps]) -> Type[TensorOps]:
+    """`ops` with maps and zips captured as `Deferred` values and fused.
+
+    Reduces and matrix multiplies run as in `ops`, computing their deferred
+    inputs first. Calls writing into an `out` tensor run immediately.
+
+    Args:
+    ----
+        ops: tensor operations object, see `tensor_ops.py`
+
+    Returns:
+    -------
+        Subclass of `ops` with lazy `map`, `zip` and `zip_scalar`.
+
+    """
+
+    @functools.lru_cache(maxsize=KERNEL_CACHE_SIZE)
+    def kernel(signature: Tuple[Any, ...], nargs: int) -> Callable[..., Tensor]:
+        fn = fuse(_rebuild(signature), nargs)
+        return ops.map(fn) if nargs == 1 else ops.zip(fn)
+
+    def run(expr: Expr, inputs: Tuple[Tensor, ...], out: Tensor) -> None:
+        kernel(_signature(expr), len(inputs))(*inputs, out)
+
+    class Lazy(ops):  # type: ignore
+        @staticmethod
+        def map(
+            fn: Callable[[float], float], out_dtype: DtypeRule = storage_dtype
+        ) -> MapProto:
+            eager = ops.map(fn, out_dtype)
+
+            def ret(a: Tensor, out: Optional[Tensor] = None) -> Tensor:
+                dtype = out_dtype(a.dtype)
+                if out is None and _fusable(dtype, a):
+                    return _defer(fn, (a,), a.shape, dtype, eager, run)
+                if out is not None:
+                    flush(out)
+                return eager(a, out)
+
+            return ret
+
+        @staticmethod
+        def zip(
+            fn: Callable[[float, float], float], out_dtype: DtypeRule = storage_dtype
+        ) -> ZipProto:
+            eager = ops.zip(fn, out_dtype)
+
+            def ret(a: Tensor, b: Tensor, out: Optional[Tensor] = None) -> Tensor:
+                dtype = out_dtype(result_dtype(a.dtype, b.dtype))
+                if out is None and _fusable(dtype, a, b):
+                    shape = shape_broadcast(a.shape, b.shape)
+                    return _defer(fn, (a, b), shape, dtype, eager, run)
+                if out is not None:
+                    flush(out)
+                return eager(a, b, out)
+
+            return ret
+
+        @staticmethod
+        def zip_scalar(fn: Callable[[float, float], float]) -> ScalarProto:
+            eager = ops.zip_scalar(fn)
+
+            def ret(a: Tensor, c: float, out: Optional[Tensor] = None) -> Tensor:
+                dtype = result_dtype(a.dtype, c)
+                if out is None and _fusable(dtype, a):
+                    return _defer(fn, (a, c), a.shape, dtype, eager, run)
+                if out is not None:
+                    flush(out)
+                return eager(a, c, out)
+
+            return ret
+
+        @staticmethod
+        def reduce(
+            fn: Callable[[float, float], float],
+            start: float = 0.0,
+            summation: str = "naive",
+            out_dtype: DtypeRule = storage_dtype,
+        ) -> ReduceProto:
+            eager = ops.reduce(fn, start, summation, out_dtype)
+
+            def ret(a: Tensor, dim: int, out: Optional[Tensor] = None) -> Tensor:
+                if out is not None:
+                    flush(out)
+                return eager(a, dim, out)
+
+            return ret
+
+    Lazy.__name__ = Lazy.__qualname__ = f"Lazy{ops.__name__}"
+    return Lazy
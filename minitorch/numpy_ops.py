@@ -0,0 +1,470 @@
+from __future__ import annotations
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+import numpy as np
+
+from . import fusion, operators
+from .tensor_data import as_array, result_dtype, shape_broadcast, storage_dtype
+from .tensor_ops import (
+    PAIRWISE_BLOCK,
+    DtypeRule,
+    MapProto,
+    ReduceProto,
+    ScalarProto,
+    TensorBackend,
+    TensorOps,
+    ZipProto,
+    check_summation,
+    kernel_workers,
+    matrix_multiply_op,
+)
+
+if TYPE_CHECKING:
+    from .tensor import Tensor
+    from .tensor_data import Shape, Storage, Strides
+
+
+# Vectorized equivalents of the scalar functions in `operators`.
+# Entries are either numpy ufuncs (which can write straight into `out`)
+# or plain functions over arrays.
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    e = np.exp(-np.abs(x))
+    return np.where(x >= 0, 1.0 / (1.0 + e), e / (1.0 + e))
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.where(x > 0, x, 0.0)
+
+
+def _log_back(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return y / x
+
+
+def _inv_back(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return -y / (x * x)
+
+
+def _relu_back(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return np.where(x > 0, y, 0.0)
+
+
+def _is_close(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return np.abs(x - y) < 1e-2
+
+
+VECTORIZED: Dict[Callable[..., Any], Callable[..., Any]] = {
+    operators.id: np.positive,
+    operators.neg: np.negative,
+    operators.inv: np.reciprocal,
+    operators.exp: np.exp,
+    operators.log: np.log,
+    operators.sigmoid: _sigmoid,
+    operators.relu: _relu,
+    operators.add: np.add,
+    operators.mul: np.multiply,
+    operators.lt: np.less,
+    operators.eq: np.equal,
+    operators.is_close: _is_close,
+    operators.log_back: _log_back,
+    operators.inv_back: _inv_back,
+    operators.relu_back: _relu_back,
+}
+
+
+def vectorize(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Return an array version of the scalar function `fn`.
+
+    Known `operators` functions map to numpy routines and fused functions
+    are rebuilt from their vectorized parts. Anything else falls back to
+    `np.vectorize` (correct, but still a Python call per element).
+    """
+    if fusion.is_fused(fn):
+        return fusion.specialize(fn, vectorize)
+    if fn in VECTORIZED:
+        return VECTORIZED[fn]
+    return np.vectorize(fn, otypes=[np.float64])
+
+
+# Thread pools shared by all kernels, one per worker count.
+_pools: Dict[int, ThreadPoolExecutor] = {}
+
+
+def thread_pool(workers: int) -> ThreadPoolExecutor:
+    """Shared thread pool with `workers` threads, created on first use."""
+    if workers not in _pools:
+        _pools[workers] = ThreadPoolExecutor(workers, thread_name_prefix="minitorch")
+    return _pools[workers]
+
+
+def chunked(
+    body: Callable[..., None],
+    workers: int,
+    out: np.ndarray,
+    *args: np.ndarray,
+    skip: Optional[int] = None,
+) -> None:
+    """Run `body(out, *args)` as up to `workers` chunks on the thread pool.
+
+    The arrays are split along the longest axis of `out` other than `skip`;
+    `args` must have the same length as `out` on every axis but `skip`.
+    Every element of `out` is computed by exactly one chunk, in the same
+    way as the unsplit call, so results do not depend on `workers`.
+    NumPy releases the GIL inside its loops, so chunks run concurrently.
+    """
+    axes = [d for d in range(out.ndim) if d != skip]
+    if workers <= 1 or not axes:
+        body(out, *args)
+        return
+    axis = max(axes, key=lambda d: out.shape[d])
+    bounds = np.linspace(0, out.shape[axis], min(workers, out.shape[axis]) + 1)
+    bounds = bounds.astype(int).tolist()
+
+    pool = thread_pool(workers)
+    futures = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        idx = (slice(None),) * axis + (slice(lo, hi),)
+        futures.append(pool.submit(body, out[idx], *(a[idx] for a in args)))
+    for future in futures:
+        future.result()
+
+
+def _apply(
+    vfn: Callable[..., Any], out: np.ndarray, *args: np.ndarray, workers: int = 1
+) -> None:
+    if workers > 1:
+        args = tuple(np.broadcast_to(a, out.shape) for a in args)
+        chunked(lambda o, *a: _apply(vfn, o, *a), workers, out, *args)
+    elif isinstance(vfn, np.ufunc):
+        # Unary ufuncs compute in the dtype of `out`, so e.g. the reciprocal
+        # of an int32 array into a float output is not truncated.
+        dtype = out.dtype if vfn.nin == 1 else None
+        vfn(*args, out=out, casting="unsafe", dtype=dtype)
+    else:
+        out[...] = vfn(*args)
+
+
+class NumpyOps(TensorOps):
+    @staticmethod
+    def map(
+        fn: Callable[[float], float], out_dtype: DtypeRule = storage_dtype
+    ) -> MapProto:
+        """See `tensor_ops.py`"""
+        f = tensor_map(fn)
+
+        def ret(a: Tensor, out: Optional[Tensor] = None) -> Tensor:
+            if out is None:
+                out = a.zeros(a.shape, out_dtype(a.dtype))
+            f(*out.tuple(), *a.tuple(), kernel_workers(a.backend, out.size))
+            return out
+
+        return ret
+
+    @staticmethod
+    def zip(
+        fn: Callable[[float, float], float], out_dtype: DtypeRule = storage_dtype
+    ) -> ZipProto:
+        """See `tensor_ops.py`"""
+        f = tensor_zip(fn)
+
+        def ret(a: Tensor, b: Tensor, out: Optional[Tensor] = None) -> Tensor:
+            if a.shape != b.shape:
+                c_shape = shape_broadcast(a.shape, b.shape)
+            else:
+                c_shape = a.shape
+            if out is None:
+                out = a.zeros(c_shape, out_dtype(result_dtype(a.dtype, b.dtype)))
+            else:
+                assert out.shape == c_shape, f"Cannot write {c_shape} into {out.shape}"
+            f(*out.tuple(), *a.tuple(), *b.tuple(), kernel_workers(a.backend, out.size))
+            return out
+
+        return ret
+
+    @staticmethod
+    def zip_scalar(fn: Callable[[float, float], float]) -> ScalarProto:
+        """See `tensor_ops.py`"""
+        vfn = vectorize(fn)
+
+        def ret(a: Tensor, c: float, out: Optional[Tensor] = None) -> Tensor:
+            if out is None:
+                out = a.zeros(a.shape, result_dtype(a.dtype, c))
+            _apply(
+                vfn,
+                as_array(*out.tuple()),
+                as_array(*a.tuple()),
+                c,
+                workers=kernel_workers(a.backend, out.size),
+            )
+            return out
+
+        return ret
+
+    @staticmethod
+    def reduce(
+        fn: Callable[[float, float], float],
+        start: float = 0.0,
+        summation: str = "naive",
+        out_dtype: DtypeRule = storage_dtype,
+    ) -> ReduceProto:
+        """See `tensor_ops.py`"""
+        check_summation(fn, summation)
+        f = tensor_reduce(fn, start, summation)
+
+        def ret(a: Tensor, dim: int, out: Optional[Tensor] = None) -> Tensor:
+            out_shape = list(a.shape)
+            out_shape[dim] = 1
+
+            if out is None:
+                out = a.zeros(tuple(out_shape), out_dtype(a.dtype))
+            else:
+                assert out.shape == tuple(out_shape), f"Cannot reduce into {out.shape}"
+            f(*out.tuple(), *a.tuple(), dim, kernel_workers(a.backend, a.size))
+            return out
+
+        return ret
+
+    @staticmethod
+    def matrix_multiply(a: Tensor, b: Tensor) -> Tensor:
+        """See `tensor_ops.py`"""
+        return _numpy_matrix_multiply(a, b)
+
+    is_cuda = False
+
+
+# Implementations.
+
+
+def tensor_map(
+    fn: Callable[[float], float],
+) -> Callable[[Storage, Shape, Strides, Storage, Shape, Strides], None]:
+    """NumPy version of `tensor_ops.tensor_map`.
+
+    Both storages are viewed as strided arrays and `fn` is applied as a
+    single array operation, with broadcasting handled by NumPy. With
+    `workers > 1` the output is split into chunks run on a thread pool.
+
+    Args:
+    ----
+        fn: function from float-to-float to apply
+
+    Returns:
+    -------
+        Tensor map function.
+
+    """
+    vfn = vectorize(fn)
+
+    def _map(
+        out: Storage,
+        out_shape: Shape,
+        out_strides: Strides,
+        in_storage: Storage,
+        in_shape: Shape,
+        in_strides: Strides,
+        workers: int = 1,
+    ) -> None:
+        # Fast path: identical dense layouts, so storage positions line up one
+        # to one.
+        if (
+            len(out) == np.prod(out_shape)
+            and np.array_equal(out_shape, in_shape)
+            and np.array_equal(out_strides, in_strides)
+        ):
+            _apply(vfn, out, in_storage, workers=workers)
+            return
+
+        _apply(
+            vfn,
+            as_array(out, out_shape, out_strides),
+            as_array(in_storage, in_shape, in_strides),
+            workers=workers,
+        )
+
+    return _map
+
+
+def tensor_zip(
+    fn: Callable[[float, float], float],
+) -> Callable[
+    [Storage, Shape, Strides, Storage, Shape, Strides, Storage, Shape, Strides], None
+]:
+    """NumPy version of `tensor_ops.tensor_zip`.
+
+    Args:
+    ----
+        fn: function mapping two floats to float to apply
+
+    Returns:
+    -------
+        Tensor zip function.
+
+    """
+    vfn = vectorize(fn)
+
+    def _zip(
+        out: Storage,
+        out_shape: Shape,
+        out_strides: Strides,
+        a_storage: Storage,
+        a_shape: Shape,
+        a_strides: Strides,
+        b_storage: Storage,
+        b_shape: Shape,
+        b_strides: Strides,
+        workers: int = 1,
+    ) -> None:
+        # Fast path: identical dense layouts, so storage positions line up one
+        # to one.
+        if (
+            len(out) == np.prod(out_shape)
+            and np.array_equal(out_shape, a_shape)
+            and np.array_equal(out_shape, b_shape)
+            and np.array_equal(out_strides, a_strides)
+            and np.array_equal(out_strides, b_strides)
+        ):
+            _apply(vfn, out, a_storage, b_storage, workers=workers)
+            return
+
+        _apply(
+            vfn,
+            as_array(out, out_shape, out_strides),
+            as_array(a_storage, a_shape, a_strides),
+            as_array(b_storage, b_shape, b_strides),
+            workers=workers,
+        )
+
+    return _zip
+
+
+def _pairwise_sum(x: np.ndarray) -> np.ndarray:
+    """Pairwise sum over the first axis of `x`, see `tensor_ops.SUMMATIONS`."""
+    partials = np.add.reduceat(x, np.arange(0, x.shape[0], PAIRWISE_BLOCK), axis=0)
+    while partials.shape[0] > 1:
+        half = partials.shape[0] // 2
+        pairs = partials[0 : 2 * half : 2] + partials[1 : 2 * half : 2]
+        if partials.shape[0] % 2:
+            pairs = np.concatenate([pairs, partials[-1:]])
+        partials = pairs
+    return partials[0]
+
+
+def _kahan_sum(x: np.ndarray) -> np.ndarray:
+    """Compensated sum over the first axis of `x`, see `tensor_ops.SUMMATIONS`.
+
+    Python only loops over the shorter of the two sides: with few outputs
+    each slice goes to `math.fsum` (exactly rounded, so at least as accurate
+    as Kahan), otherwise Kahan runs vectorized across the outputs.
+    """
+    if x.shape[0] > x[0].size:
+        rows = x.reshape(x.shape[0], -1).T
+        return np.array([math.fsum(row) for row in rows]).reshape(x.shape[1:])
+
+    acc = np.zeros(x.shape[1:])
+    c = np.zeros(x.shape[1:])
+    t = np.empty(x.shape[1:])
+    for row in x:
+        np.add(acc, row, out=t)
+        c += np.where(np.abs(acc) >= np.abs(row), (acc - t) + row, (row - t) + acc)
+        acc, t = t, acc
+    return acc + c
+
+
+def tensor_reduce(
+    fn: Callable[[float, float], float],
+    start: float = 0.0,
+    summation: str = "naive",
+) -> Callable[[Storage, Shape, Strides, Storage, Shape, Strides, int], None]:
+    """NumPy version of `tensor_ops.tensor_reduce`.
+
+    `add` and `mul` use the matching ufunc reduction. Other functions are
+    folded along `reduce_dim` one slice at a time, vectorized over the
+    remaining dimensions, in the same order as `SimpleOps`. With
+    `workers > 1` the outputs are split into chunks run on a thread pool;
+    each output is still reduced by a single thread, so results are
+    deterministic.
+
+    Args:
+    ----
+        fn: reduction function mapping two floats to float
+        start: initial value of the reduction
+        summation: accumulation scheme when `fn` is `operators.add`
+
+    Returns:
+    -------
+        Tensor reduce function.
+
+    """
+    vfn = vectorize(fn)
+    fold = {"pairwise": _pairwise_sum, "kahan": _kahan_sum}.get(summation)
+
+    def _reduce_arrays(out_arr: np.ndarray, a_arr: np.ndarray, reduce_dim: int) -> None:
+        if fold is not None:
+            total = fold(np.moveaxis(a_arr, reduce_dim, 0))
+            out_arr[...] = start + np.expand_dims(total, reduce_dim)
+            return
+
+        if vfn is np.add or vfn is np.multiply:
+            vfn.reduce(
+                a_arr, axis=reduce_dim, keepdims=True, initial=start, out=out_arr
+            )
+            return
+
+        out_arr[...] = start
+        for j in range(a_arr.shape[reduce_dim]):
+            out_arr[...] = vfn(
+                np.take(a_arr, [j], axis=reduce_dim),
+                out_arr,
+            )
+
+    def _reduce(
+        out: Storage,
+        out_shape: Shape,
+        out_strides: Strides,
+        a_storage: Storage,
+        a_shape: Shape,
+        a_strides: Strides,
+        reduce_dim: int,
+        workers: int = 1,
+    ) -> None:
+        chunked(
+            lambda o, a: _reduce_arrays(o, a, reduce_dim),
+            workers,
+            as_array(out, out_shape, out_strides),
+            as_array(a_storage, a_shape, a_strides),
+            skip=reduce_dim,
+        )
+
+    return _reduce
+
+
+def tensor_matrix_multiply(
+    out: Storage,
+    out_shape: Shape,
+    out_strides: Strides,
+    a_storage: Storage,
+    a_shape: Shape,
+    a_strides: Strides,
+    b_storage: Storage,
+    b_shape: Shape,
+    b_strides: Strides,
+) -> None:
+    """NumPy version of `tensor_ops.tensor_matrix_multiply`.
+
+    `np.matmul` broadcasts the batch dimensions and hands each matrix
+    product to BLAS, which does its own cache blocking.
+    """
+    np.matmul(
+        as_array(a_storage, a_shape, a_strides),
+        as_array(b_storage, b_shape, b_strides),
+        out=as_array(out, out_shape, out_strides),
+    )
+
+
+_numpy_matrix_multiply = matrix_multiply_op(tensor_matrix_multiply)
+
+NumpyBackend = TensorBackend(NumpyOps)
@@ -78,7 +78,7 @@ def exp(x: Any, /) -> float:
 def log(x: Any, /) -> float:
     """Logarithmic operator. Returns the natural log of the passed argument"""
     assert x > 0, "Cannot log a non-positive value"
-    return math.log(x, math.e)
+    return math.log(x)
 
 
 def log_back(x: Any, y: Any, /) -> float:
@@ -95,15 +95,15 @@ def log_back(x: Any, y: Any, /) -> float:
 
     """
     assert x > 0, "log derivative only defined for positive values"
-    return inv(x) * y
+    return y / x
 
 
 def relu(x: Any, /) -> float:
     """ReLU (Rectified Linear Unit) operator. Returns the maximum of 0 and the passed argument"""
-    return float(max(0, x))
+    return float(x) if x > 0 else 0.0
 
 
-def relu_back(x: Any, y: Any, /, *, ignore0: bool = True) -> float:
+def relu_back(x: Any, y: Any, /, ignore0: bool = True) -> float:
     """ReLU back operator - calculates the derivative of relu() at the first argument then scales by the second
 
     Args:
@@ -139,12 +139,12 @@ def mul(x: Any, y: Any, /) -> float:
 
 def eq(x: Any, y: Any, /) -> float:
     """Equality operator. Returns 1 only if the passed arguments are equal else 0"""
-    return float(x == y)
+    return 1.0 if x == y else 0.0
 
 
 def lt(x: Any, y: Any, /) -> float:
     """Less than operator. Returns 1 only if the first argument is less than the second else 0"""
-    return float(x < y)
+    return 1.0 if x < y else 0.0
 
 
 def is_close(x: Any, y: Any, /) -> bool:
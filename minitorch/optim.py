@@ -1,4 +1,4 @@
-from typing import Sequence
+from typing import Any, Dict, Sequence
 
 from .module import Parameter
 from .scalar import Scalar
@@ -13,9 +13,15 @@ class SGD(Optimizer):
     def __init__(self, parameters: Sequence[Parameter], lr: float = 1.0):
         super().__init__(parameters)
         self.lr = lr
+        # Per-parameter scratch tensors for `lr * grad`, reused across steps.
+        self._updates: Dict[int, Any] = {}
 
     def zero_grad(self) -> None:
-        """Removes the stored gradient and derivative of the optimizer's parameters"""
+        """Removes the stored gradient and derivative of the optimizer's parameters.
+
+        Tensor gradients are zeroed in place so their storage is reused by
+        the next backward pass.
+        """
         for p in self.parameters:
             if p.value is None:
                 continue
@@ -24,10 +30,13 @@ class SGD(Optimizer):
                     p.value.derivative = None
             if hasattr(p.value, "grad"):
                 if p.value.grad is not None:
-                    p.value.grad = None
+                    p.value.grad.fill_(0.0)
 
     def step(self) -> None:
-        """Updates the parameters of the optimizer according to the current learning rate and gradient descent rules"""
+        """Updates the parameters of the optimizer according to the current learning rate and gradient descent rules.
+
+        Tensor parameters are updated in place.
+        """
         for p in self.parameters:
             if p.value is None:
                 continue
@@ -35,5 +44,9 @@ class SGD(Optimizer):
                 if p.value.derivative is not None:
                     p.update(Scalar(p.value.data - self.lr * p.value.derivative))
             elif hasattr(p.value, "grad"):
-                if p.value.grad is not None:
-                    p.update(p.value - self.lr * p.value.grad)
+                grad = p.value.grad
+                if grad is not None:
+                    update = self._updates.get(id(p))
+                    if update is None or update.shape != grad.shape:
+                        update = self._updates[id(p)] = grad.zeros()
+                    p.value.add_(update.fill_(-self.lr).mul_(grad))
@@ -0,0 +1,369 @@
+"""Process pool backend for pure-Python scalar functions.
+
+`SimpleOps` calls `fn` once per element under the GIL, so custom Python
+functions run on one core whatever the machine. `ProcessOps` allocates
+the storages of its tensors of at least `threshold` elements (outputs,
+factories such as `zeros` and `tensor`, see `ProcessOps.storage`) in
+`multiprocessing.shared_memory` and splits the element loop of large
+kernels into chunks run by a persistent pool of worker processes.
+Workers attach to the shared blocks by name, read and write them in
+place, and build only their chunk of the index plan; only the block
+names, shapes and strides are sent to them.
+
+`fn` must be picklable, i.e. defined at module level (every function in
+`operators` is). Fused functions from `fusion` are sent as their
+expression and rebuilt in the worker.
+"""
+
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from . import fusion
+from .tensor_data import index_plans, result_dtype, shape_broadcast, storage_dtype
+from .tensor_ops import (
+    DtypeRule,
+    MapProto,
+    ReduceProto,
+    ScalarProto,
+    SimpleOps,
+    TensorBackend,
+    TensorOps,
+    ZipProto,
+    check_summation,
+    kahan_sum,
+    kernel_workers,
+    pairwise_sum,
+)
+
+if TYPE_CHECKING:
+    from .tensor import Tensor
+    from .tensor_data import Storage
+
+    # (block name, offset, length, dtype, shape, strides) of a shared storage.
+    Spec = Tuple[str, int, int, str, Tuple[int, ...], Tuple[int, ...]]
+
+
+# Shared storages.
+
+# Blocks backing live storages, keyed on the id of the storage array.
+_blocks: Dict[int, Tuple[shared_memory.SharedMemory, weakref.ref]] = {}
+# Unlinked blocks still waiting for their buffer exports to go away.
+_closing: List[shared_memory.SharedMemory] = []
+
+
+def shared_storage(size: int, dtype: npt.DTypeLike = np.float64) -> Storage:
+    """Allocate a zeroed storage of `size` elements of `dtype` in shared memory.
+
+    The block is unlinked when the returned array is garbage collected.
+    """
+    _close_released()
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1) * dtype.itemsize)
+    storage: Storage = np.ndarray((size,), dtype=dtype, buffer=shm.buf)
+    storage[:] = 0.0
+    # The mapping outlives the file descriptor, so close it now. (The mmap
+    # object keeps a duplicate of its own, so a block still holds one.)
+    if getattr(shm, "_fd", -1) >= 0:
+        os.close(shm._fd)  # type: ignore
+        shm._fd = -1  # type: ignore
+    _blocks[id(storage)] = (shm, weakref.ref(storage))
+    weakref.finalize(storage, _release, id(storage))
+    return storage
+
+
+def _release(key: int) -> None:
+    shm, _ = _blocks.pop(key)
+    shm.unlink()
+    # The array's buffer export is only dropped after finalizers run, so
+    # closing the mapping has to wait.
+    _closing.append(shm)
+
+
+def _close_released() -> None:
+    pending = list(_closing)
+    _closing.clear()
+    for shm in pending:
+        try:
+            shm.close()
+        except BufferError:
+            _closing.append(shm)
+
+
+def _shared_root(storage: Storage) -> Optional[Tuple[str, int]]:
+    """Block name and element offset of `storage` if it lives in shared memory."""
+    root: Any = storage
+    while root is not None:
+        entry = _blocks.get(id(root))
+        if entry is not None and entry[1]() is root:
+            offset = (storage.ctypes.data - root.ctypes.data) // storage.itemsize
+            return entry[0].name, offset
+        root = getattr(root, "base", None)
+    return None
+
+
+def _spec(t: Tensor) -> Tuple[Spec, Optional[Storage]]:
+    """Describe the storage of `t` for a worker.
+
+    Storages outside shared memory (tensors of other backends, or made
+    with `from_numpy`) are copied into a temporary block, which is
+    returned alongside so it stays alive for the call.
+    """
+    storage = t._tensor.storage
+    root = _shared_root(storage)
+    copy = None
+    if root is None:
+        copy = shared_storage(len(storage), storage.dtype)
+        copy[:] = storage
+        root = _shared_root(copy)
+        assert root is not None
+    spec = (*root, len(storage), storage.dtype.str, t.shape, t._tensor.strides)
+    return spec, copy
+
+
+# Process pools shared by all kernels, one per worker count.
+_pools: Dict[int, ProcessPoolExecutor] = {}
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared process pool with `workers` processes, created on first use."""
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pools[workers]
+
+
+def _portable(fn: Callable[..., float]) -> Any:
+    """Picklable form of `fn`, see `_resolve`."""
+    if fusion.is_fused(fn):
+        return ("fused", fn.expr, fn.nargs)  # type: ignore
+    return fn
+
+
+def _resolve(fn: Any) -> Callable[..., float]:
+    """Rebuild a function sent by `_portable`, or bound by `zip_scalar`."""
+    if isinstance(fn, tuple):
+        tag, *args = fn
+        if tag == "scalar":
+            inner, c = args
+            return functools.partial(_with_scalar, _resolve(inner), c)
+        return fusion.fuse(*args)
+    return fn
+
+
+def _run(
+    kind: str, fn: Any, lo: int, hi: int, specs: Tuple[Spec, ...], extra: Any
+) -> None:
+    """Worker entry point: compute output ordinals `lo` to `hi` of a kernel."""
+    # Workers share the parent's resource tracker, so attaching does not
+    # take ownership: blocks are only unlinked by the process creating them.
+    blocks = [shared_memory.SharedMemory(name=name) for name, *_ in specs]
+    try:
+        _compute(kind, _resolve(fn), lo, hi, blocks, specs, extra)
+    finally:
+        for shm in blocks:
+            try:
+                shm.close()
+            except BufferError:  # pragma: no cover
+                pass
+
+
+def _compute(
+    kind: str,
+    fn: Callable[..., float],
+    lo: int,
+    hi: int,
+    blocks: List[shared_memory.SharedMemory],
+    specs: Tuple[Spec, ...],
+    extra: Any,
+) -> None:
+    storages = [
+        np.ndarray((offset + n,), dtype=dtype, buffer=shm.buf)[offset:]
+        for shm, (_, offset, n, dtype, _, _) in zip(blocks, specs)
+    ]
+    shapes = [np.array(spec[4]) for spec in specs]
+    strides = [np.array(spec[5]) for spec in specs]
+    out = storages[0]
+
+    # Each worker only builds the part of the plan for its own chunk.
+    if kind == "reduce":
+        out_pos, a_pos = index_plans.reduce_positions(
+            shapes[0], strides[0], shapes[1], strides[1], extra, span=(lo, hi)
+        )
+        rows = zip(out[out_pos].tolist(), storages[1][a_pos].tolist())
+        out[out_pos] = [fn(acc, row) for acc, row in rows]
+        return
+
+    out_pos, *in_pos = index_plans.positions(
+        shapes[0], strides[0], *zip(shapes[1:], strides[1:]), span=(lo, hi)
+    )
+    values = [s[p].tolist() for s, p in zip(storages[1:], in_pos)]
+    out[out_pos] = [fn(*xs) for xs in zip(*values)]
+
+
+def _fold(fn: Callable[[float, float], float], acc: float, row: List[float]) -> float:
+    """Fold a row with the reduction function `fn`, like `SimpleOps.reduce`."""
+    for x in row:
+        acc = fn(x, acc)
+    return acc
+
+
+def _with_scalar(fn: Callable[[float, float], float], c: float, x: float) -> float:
+    """`fn(x, c)`, bound to `fn` and `c` with `functools.partial` in the worker."""
+    return fn(x, c)
+
+
+def _launch(
+    kind: str,
+    fn: Any,
+    workers: int,
+    out: Tensor,
+    inputs: Tuple[Tensor, ...],
+    extra: Any = None,
+) -> None:
+    """Run a kernel on the process pool, writing into `out`."""
+    out_spec, out_copy = _spec(out)
+    specs_and_copies = [_spec(t) for t in inputs]
+    specs = (out_spec, *(spec for spec, _ in specs_and_copies))
+
+    bounds = np.linspace(0, out.size, min(workers, out.size) + 1).astype(int).tolist()
+    pool = process_pool(workers)
+    futures = [
+        pool.submit(_run, kind, fn, lo, hi, specs, extra)
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    ]
+    for future in futures:
+        future.result()
+
+    if out_copy is not None:
+        out._tensor.storage[:] = out_copy
+
+
+def _zeros(a: Tensor, shape: Tuple[int, ...], dtype: Any = None) -> Tensor:
+    dtype = a.dtype if dtype is None else dtype
+    storage = shared_storage(int(np.prod(shape)), dtype)
+    return a.make(storage, shape, backend=a.backend)
+
+
+class ProcessOps(TensorOps):
+    @staticmethod
+    def storage(values: Storage, threshold: int) -> Storage:
+        """Copy `values` into shared memory, unless they already live there.
+
+        `Tensor.make` stores every tensor of the backend this way, so kernel
+        inputs and outputs reach the workers without a copy per call. Tensors
+        smaller than `threshold` never run on the workers, and stay in
+        ordinary memory: a shared block costs a file mapping each.
+        """
+        if len(values) < threshold or _shared_root(values) is not None:
+            return values
+        storage = shared_storage(len(values), values.dtype)
+        storage[:] = values
+        return storage
+
+    @staticmethod
+    def map(
+        fn: Callable[[float], float], out_dtype: DtypeRule = storage_dtype
+    ) -> MapProto:
+        """See `tensor_ops.py`"""
+        simple = SimpleOps.map(fn, out_dtype)
+        portable = _portable(fn)
+
+        def ret(a: Tensor, out: Optional[Tensor] = None) -> Tensor:
+            workers = kernel_workers(a.backend, a.size if out is None else out.size)
+            if workers <= 1:
+                return simple(a, out)
+            if out is None:
+                out = _zeros(a, a.shape, out_dtype(a.dtype))
+            _launch("map", portable, workers, out, (a,))
+            return out
+
+        return ret
+
+    @staticmethod
+    def zip(
+        fn: Callable[[float, float], float], out_dtype: DtypeRule = storage_dtype
+    ) -> ZipProto:
+        """See `tensor_ops.py`"""
+        simple = SimpleOps.zip(fn, out_dtype)
+        portable = _portable(fn)
+
+        def ret(a: Tensor, b: Tensor, out: Optional[Tensor] = None) -> Tensor:
+            c_shape = shape_broadcast(a.shape, b.shape)
+            workers = kernel_workers(a.backend, int(np.prod(c_shape)))
+            if workers <= 1:
+                return simple(a, b, out)
+            if out is None:
+                out = _zeros(a, c_shape, out_dtype(result_dtype(a.dtype, b.dtype)))
+            else:
+                assert out.shape == c_shape, f"Cannot write {c_shape} into {out.shape}"
+            _launch("zip", portable, workers, out, (a, b))
+            return out
+
+        return ret
+
+    @staticmethod
+    def zip_scalar(fn: Callable[[float, float], float]) -> ScalarProto:
+        """See `tensor_ops.py`"""
+        simple = SimpleOps.zip_scalar(fn)
+        portable = _portable(fn)
+
+        def ret(a: Tensor, c: float, out: Optional[Tensor] = None) -> Tensor:
+            workers = kernel_workers(a.backend, a.size if out is None else out.size)
+            if workers <= 1:
+                return simple(a, c, out)
+            if out is None:
+                out = _zeros(a, a.shape, result_dtype(a.dtype, c))
+            _launch("map", ("scalar", portable, c), workers, out, (a,))
+            return out
+
+        return ret
+
+    @staticmethod
+    def reduce(
+        fn: Callable[[float, float], float],
+        start: float = 0.0,
+        summation: str = "naive",
+        out_dtype: DtypeRule = storage_dtype,
+    ) -> ReduceProto:
+        """See `tensor_ops.py`"""
+        check_summation(fn, summation)
+        simple = SimpleOps.reduce(fn, start, summation, out_dtype)
+        fold = {"pairwise": pairwise_sum, "kahan": kahan_sum}.get(summation)
+        portable = fold if fold is not None else functools.partial(_fold, fn)
+
+        def ret(a: Tensor, dim: int, out: Optional[Tensor] = None) -> Tensor:
+            workers = kernel_workers(a.backend, a.size)
+            if workers <= 1:
+                return simple(a, dim, out)
+            out_shape = list(a.shape)
+            out_shape[dim] = 1
+            if out is None:
+                out = _zeros(a, tuple(out_shape), out_dtype(a.dtype))
+            else:
+                assert out.shape == tuple(out_shape), f"Cannot reduce into {out.shape}"
+            out.fill_(start)
+            _launch("reduce", portable, workers, out, (a,), dim)
+            return out
+
+        return ret
+
+    @staticmethod
+    def matrix_multiply(a: Tensor, b: Tensor) -> Tensor:
+        """See `tensor_ops.py`"""
+        return SimpleOps.matrix_multiply(a, b)
+
+    is_cuda = False
+
+
+ProcessBackend = TensorBackend(ProcessOps)
@@ -2,21 +2,30 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import itertools
 from typing import TYPE_CHECKING
 
 import numpy as np
 
-from . import operators
+from . import fusion, operators
 from .autodiff import Context, Variable, backpropagate
-from .tensor_data import TensorData
-from .tensor_functions import tensor
+from .tensor_data import (
+    IndexingError,
+    TensorData,
+    as_array,
+    index_plans,
+    result_dtype,
+    storage_pool,
+    view_strides,
+)
 
 # Comment these out if not yet implemented
 from .tensor_functions import (
     Copy,
     View,
     Permute,
+    Slice,
+    BroadcastTo,
     Neg,
     Inv,
     Log,
@@ -24,7 +33,9 @@ from .tensor_functions import (
     ReLU,
     Sigmoid,
     Add,
+    AddScalar,
     Mul,
+    MulScalar,
     MatMul,
     EQ,
     LT,
@@ -34,7 +45,18 @@ from .tensor_functions import (
 )
 
 if TYPE_CHECKING:
-    from typing import Any, Iterable, List, Optional, Sequence, Tuple, Type, Union
+    from typing import (
+        Any,
+        Callable,
+        Dict,
+        Iterable,
+        List,
+        Optional,
+        Sequence,
+        Tuple,
+        Type,
+        Union,
+    )
 
     import numpy.typing as npt
 
@@ -45,18 +67,29 @@ if TYPE_CHECKING:
     TensorLike = Union[float, int, "Tensor"]
 
 
-@dataclass
 class History:
     """`History` stores the history of `Function` operations that was
     used to construct the current Variable.
     """
 
-    last_fn: Optional[Type[Function]] = None
-    ctx: Optional[Context] = None
-    inputs: Sequence[Tensor] = ()
+    __slots__ = ("last_fn", "ctx", "inputs")
 
+    def __init__(
+        self,
+        last_fn: Optional[Type[Function]] = None,
+        ctx: Optional[Context] = None,
+        inputs: Sequence[Tensor] = (),
+    ):
+        self.last_fn = last_fn
+        self.ctx = ctx
+        self.inputs = inputs
 
-_tensor_count = 0
+
+# Source of `Tensor.unique_id`.
+_tensor_ids = itertools.count(1)
+
+# Interned constants kept per backend before the table is reset.
+MAX_CONSTANTS = 1024
 
 
 class Tensor:
@@ -64,6 +97,17 @@ class Tensor:
     handles multidimensional arrays.
     """
 
+    __slots__ = (
+        "backend",
+        "history",
+        "grad",
+        "_tensor",
+        "unique_id",
+        "name",
+        "f",
+        "__weakref__",
+    )
+
     backend: TensorBackend
     history: Optional[History]
     grad: Optional[Tensor]
@@ -78,9 +122,7 @@ class Tensor:
         name: Optional[str] = None,
         backend: Optional[TensorBackend] = None,
     ):
-        global _tensor_count
-        _tensor_count += 1
-        self.unique_id = _tensor_count
+        self.unique_id = next(_tensor_ids)
         assert isinstance(v, TensorData)
         assert backend is not None
         self._tensor = v
@@ -99,6 +141,11 @@ class Tensor:
         """Size of tensor"""
         return self._tensor.size
 
+    @property
+    def dims(self) -> int:
+        """Number of dimensions of the tensor"""
+        return self._tensor.dims
+
     def requires_grad_(self, x: bool) -> None:
         """Creates a gradient for the tensor"""
         self.history = History()
@@ -111,17 +158,57 @@ class Tensor:
         """Removes gradient"""
         self.grad = None
 
-    def to_numpy(self) -> npt.NDArray[np.float64]:
+    def to_numpy(self) -> npt.NDArray[Any]:
         """Returns
-        Converted to numpy array
+        An ndarray viewing this tensor's storage, without copying.
+
+        Writes to the array show up in the tensor. Broadcast views (with
+        stride-0 dimensions) come back read-only.
 
         """
-        return self.contiguous()._tensor._storage.reshape(self.shape)
+        array = as_array(*self.tuple())
+        if any(s == 0 and n > 1 for n, s in zip(self.shape, self._tensor.strides)):
+            array.flags.writeable = False
+        return array
+
+    def __array__(
+        self, dtype: Optional[npt.DTypeLike] = None, copy: Optional[bool] = None
+    ) -> npt.NDArray[Any]:
+        array = self.to_numpy()
+        if dtype is not None and np.dtype(dtype) != array.dtype:
+            if copy is False:
+                raise ValueError(f"Converting {self.dtype} to {dtype} needs a copy.")
+            return array.astype(dtype)
+        return array.copy() if copy else array
+
+    @property
+    def __array_interface__(self) -> Dict[str, Any]:
+        return self.to_numpy().__array_interface__
+
+    def __dlpack__(self, **kwargs: Any) -> Any:
+        return self.to_numpy().__dlpack__(**kwargs)
+
+    def __dlpack_device__(self) -> Tuple[int, int]:
+        return self.to_numpy().__dlpack_device__()
 
     def _ensure_tensor(self, b: TensorLike) -> Tensor:
-        """Turns a python number into a tensor with the same backend."""
+        """Turns a python number into a tensor with the same backend.
+
+        Numbers take the dtype of `self` unless it cannot hold them (e.g. a
+        float next to an int32 or bool tensor), following NumPy promotion.
+        The tensors are interned per backend (they are only ever read), so
+        a constant used every step is built once.
+        """
         if isinstance(b, (int, float)):
-            c = Tensor.make([b], (1,), backend=self.backend)
+            dtype = result_dtype(self.dtype, b)
+            constants = self.backend.constants
+            key = (dtype.str, repr(b))
+            c = constants.get(key)
+            if c is None:
+                if len(constants) >= MAX_CONSTANTS:
+                    constants.clear()
+                c = Tensor.make([b], (1,), backend=self.backend, dtype=dtype)
+                constants[key] = c
         else:
             b._type_(self.backend)
             c = b
@@ -130,7 +217,7 @@ class Tensor:
     def item(self) -> float:
         """Convert a 1-element tensor to a float"""
         assert self.size == 1
-        x: float = self._tensor._storage[0]
+        x: float = self._tensor._storage[self._tensor._offset].item()
         return x
 
     def contiguous(self) -> Tensor:
@@ -140,14 +227,114 @@ class Tensor:
     def __repr__(self) -> str:
         return self._tensor.to_string()
 
-    def __getitem__(self, key: Union[int, UserIndex]) -> float:
-        key2 = (key,) if isinstance(key, int) else key
-        return self._tensor.get(key2)
+    def __getitem__(self, key: Union[int, slice, Tuple[Union[int, slice], ...]]) -> Any:
+        """A float for a full index, otherwise a view of the selected elements.
+
+        Integers select (and drop) a dimension, slices with positive steps keep
+        it, and missing trailing dimensions are kept whole. Views share the
+        storage of `self`, so taking a mini-batch or a column copies nothing.
+        """
+        key2 = key if isinstance(key, tuple) else (key,)
+        if len(key2) == self.dims and not any(isinstance(k, slice) for k in key2):
+            return self._tensor.get(key2)
+        if len(key2) > self.dims:
+            raise IndexingError(f"Too many indices {key2} for {self.shape}.")
+
+        starts, lengths, steps, shape = [], [], [], []
+        for d, size in enumerate(self.shape):
+            k = key2[d] if d < len(key2) else slice(None)
+            if isinstance(k, slice):
+                start, stop, step = k.indices(size)
+                if step < 1:
+                    raise IndexingError(f"Slice step must be positive, got {step}.")
+                starts.append(start)
+                lengths.append(len(range(start, stop, step)))
+                steps.append(step)
+                shape.append(lengths[-1])
+            else:
+                index = int(k) + size if k < 0 else int(k)
+                if not 0 <= index < size:
+                    raise IndexingError(f"Index {k} out of range {size}.")
+                starts.append(index)
+                lengths.append(1)
+                steps.append(1)
+
+        out = Slice.apply(self, starts, lengths, steps)
+        return out.view(*shape) if len(shape) != self.dims else out
 
     def __setitem__(self, key: Union[int, UserIndex], val: float) -> None:
         key2 = (key,) if isinstance(key, int) else key
+        fusion.flush(self)
         self._tensor.set(key2, val)
 
+    def broadcast_to(self, *shape: int) -> Tensor:
+        """View broadcast to `shape` without copying (stride 0 on broadcast dimensions)"""
+        return BroadcastTo.apply(self, shape)
+
+    def narrow(self, dim: int, start: int, length: int) -> Tensor:
+        """View `length` elements of dimension `dim` starting at `start`"""
+        starts, lengths = [0] * self.dims, list(self.shape)
+        starts[dim], lengths[dim] = start, length
+        return Slice.apply(self, starts, lengths, [1] * self.dims)
+
+    def select(self, dim: int, index: int) -> Tensor:
+        """View the elements at `index` of dimension `dim`, dropping the dimension"""
+        out = self.narrow(dim, index, 1)
+        if self.dims == 1:
+            return out
+        return out.view(*(s for d, s in enumerate(self.shape) if d != dim))
+
+    # In-place operations. These write into the existing storage and do not
+    # record history, so they are meant for optimizer updates and gradient
+    # buffers rather than values in the middle of a graph. Deferred values
+    # reading the storage are computed first (see `fusion.flush`).
+
+    def fill_(self, value: float) -> Tensor:
+        """Set every element to `value` in place"""
+        fusion.flush(self)
+        storage, shape, strides = self.tuple()
+        if self._tensor.is_contiguous() and len(storage) == self.size:
+            storage[:] = value
+        else:
+            (positions,) = index_plans.positions(shape, strides)
+            storage[positions] = value
+        return self
+
+    def add_(self, b: TensorLike) -> Tensor:
+        """Add `b` (broadcast to this shape) in place"""
+        self.backend.add_zip(self, self._operand(b), self)
+        return self
+
+    def sub_(self, b: TensorLike) -> Tensor:
+        """Subtract `b` (broadcast to this shape) in place"""
+        if isinstance(b, (int, float)):
+            return self.add_(-b)
+        self.backend.add_zip(self, self.backend.neg_map(self._operand(b)), self)
+        return self
+
+    def mul_(self, b: TensorLike) -> Tensor:
+        """Multiply by `b` (broadcast to this shape) in place"""
+        self.backend.mul_zip(self, self._operand(b), self)
+        return self
+
+    def _operand(self, b: TensorLike) -> Tensor:
+        """`b` as a tensor safe to read while writing `self` in place.
+
+        Parallel kernels read and write elements in no fixed order, so an
+        operand overlapping the storage of `self` with a different layout
+        (a transpose or shifted view of it) is copied first.
+        """
+        b = self._ensure_tensor(b)
+        if fusion.pending(b) or (b.shape, b._tensor.strides, b._tensor._offset) == (
+            self.shape,
+            self._tensor.strides,
+            self._tensor._offset,
+        ):
+            return b
+        if np.may_share_memory(b._tensor._storage, self._tensor._storage):
+            return self.backend.id_map(b)
+        return b
+
     # Internal methods used for autodiff.
     def _type_(self, backend: TensorBackend) -> None:
         self.backend = backend
@@ -163,9 +350,13 @@ class Tensor:
         shape: UserShape,
         strides: Optional[UserStrides] = None,
         backend: Optional[TensorBackend] = None,
+        dtype: Optional[npt.DTypeLike] = None,
     ) -> Tensor:
-        """Create a new tensor from data"""
-        return Tensor(TensorData(storage, shape, strides), backend=backend)
+        """Create a new tensor from data, in storage allocated by `backend`"""
+        tensor_data = TensorData(storage, shape, strides, dtype=dtype)
+        if backend is not None:
+            tensor_data._storage = backend.storage(tensor_data._storage)
+        return Tensor(tensor_data, backend=backend)
 
     def expand(self, other: Tensor) -> Tensor:
         """Method used to allow for backprop over broadcasting.
@@ -186,10 +377,10 @@ class Tensor:
         if self.shape == other.shape:
             return other
 
-        # Case 2: Backward is a smaller than self. Broadcast up.
+        # Case 2: Backward is a smaller than self. Broadcast up, as a
+        # stride-0 view rather than a copy.
         true_shape = TensorData.shape_broadcast(self.shape, other.shape)
-        buf = self.zeros(true_shape)
-        self.backend.id_map(other, buf)
+        buf = self._new(other._tensor.broadcast_to(true_shape))
         if self.shape == true_shape:
             return buf
 
@@ -201,15 +392,27 @@ class Tensor:
                 out = self.backend.add_reduce(out, dim)
         assert out.size == self.size, f"{out.shape} {self.shape}"
         # START CODE CHANGE (2021)
-        return Tensor.make(out._tensor._storage, self.shape, backend=self.backend)
+        # Only size-1 dimensions differ, so this is always a view.
+        strides = view_strides(out.shape, out._tensor.strides, self.shape)
+        return self._new(
+            TensorData(
+                out._tensor._storage, self.shape, strides, offset=out._tensor._offset
+            )
+        )
         # END CODE CHANGE (2021)
 
-    def zeros(self, shape: Optional[UserShape] = None) -> Tensor:
-        """Creates a tensor of zeros with shape defaulting to that of `self`"""
+    def zeros(
+        self, shape: Optional[UserShape] = None, dtype: Optional[npt.DTypeLike] = None
+    ) -> Tensor:
+        """Creates a tensor of zeros with shape and dtype defaulting to those of `self`"""
 
         def zero(shape: UserShape) -> Tensor:
             return Tensor.make(
-                [0.0] * int(operators.prod(shape)), shape, backend=self.backend
+                storage_pool.zeros(
+                    int(operators.prod(shape)), self.dtype if dtype is None else dtype
+                ),
+                shape,
+                backend=self.backend,
             )
 
         if shape is None:
@@ -240,12 +443,8 @@ class Tensor:
         """
         assert self.is_leaf(), "Only leaf variables can have derivatives."
         if self.grad is None:
-            self.grad = Tensor.make(
-                [0.0] * int(operators.prod(self.shape)),
-                self.shape,
-                backend=self.backend,
-            )
-        self.grad += x
+            self.grad = self.zeros()
+        self.grad.add_(x)
 
     def is_leaf(self) -> bool:
         """True if this variable created by the user (no `last_fn`)"""
@@ -296,34 +495,55 @@ class Tensor:
         """
         if grad_output is None:
             assert self.shape == (1,), "Must provide grad_output if non-scalar"
-            grad_output = Tensor.make([1.0], (1,), backend=self.backend)
+            grad_output = Tensor.make(
+                [1.0], (1,), backend=self.backend, dtype=self.dtype
+            )
         backpropagate(self, grad_output)
 
     def __neg__(self):
         return Neg.apply(self)
 
+    # Python numbers take the scalar kernels (`add_scalar`, `mul_scalar`)
+    # rather than a broadcast zip against a 1-element tensor.
+
     def __add__(self, b: TensorLike) -> Tensor:
+        if isinstance(b, (int, float)):
+            return AddScalar.apply(self, b)
         return Add.apply(self, self._ensure_tensor(b))
 
     def __radd__(self, b: TensorLike) -> Tensor:
+        if isinstance(b, (int, float)):
+            return AddScalar.apply(self, b)
         return Add.apply(self._ensure_tensor(b), self)
 
     def __sub__(self, b: TensorLike) -> Tensor:
+        if isinstance(b, (int, float)):
+            return AddScalar.apply(self, -b)
         return Add.apply(self, Neg.apply(self._ensure_tensor(b)))
 
     def __rsub__(self, b: TensorLike) -> Tensor:
+        if isinstance(b, (int, float)):
+            return AddScalar.apply(Neg.apply(self), b)
         return Add.apply(self._ensure_tensor(b), Neg.apply(self))
 
     def __mul__(self, b: TensorLike) -> Tensor:
+        if isinstance(b, (int, float)):
+            return MulScalar.apply(self, b)
         return Mul.apply(self, self._ensure_tensor(b))
 
     def __rmul__(self, b: TensorLike) -> Tensor:
+        if isinstance(b, (int, float)):
+            return MulScalar.apply(self, b)
         return Mul.apply(self._ensure_tensor(b), self)
 
     def __truediv__(self, b: TensorLike) -> Tensor:
+        if isinstance(b, (int, float)):
+            return MulScalar.apply(self, operators.inv(b))
         return Mul.apply(self, Inv.apply(self._ensure_tensor(b)))
 
     def __rtruediv__(self, b: TensorLike) -> Tensor:
+        if isinstance(b, (int, float)):
+            return MulScalar.apply(Inv.apply(self), b)
         return Mul.apply(self._ensure_tensor(b), Inv.apply(self))
 
     def __matmul__(self, b: Tensor) -> Tensor:
@@ -351,6 +571,14 @@ class Tensor:
         """
         return self._tensor.shape
 
+    @property
+    def dtype(self) -> np.dtype:
+        """Returns
+        element type of the storage
+
+        """
+        return self._tensor.dtype
+
     def inv(self) -> Tensor:
         """Invokes the inverse function on `self`"""
         return Inv.apply(self)
@@ -374,16 +602,29 @@ class Tensor:
     def all(self, dim: int | None = None) -> Tensor:
         """Computes truthiness over a specified axis or all contained values if not provided"""
         if dim is None:
-            return All.apply(self.contiguous().view(self.size), self._ensure_tensor(0))
+            return All.apply(self._flatten(All.apply), 0)
         else:
-            return All.apply(self, self._ensure_tensor(dim))
+            return All.apply(self, dim)
 
     def sum(self, dim: int | None = None) -> Tensor:
         """Computes sum over a specified axis or all contained values if not provided"""
         if dim is None:
-            return Sum.apply(self.contiguous().view(self.size), self._ensure_tensor(0))
+            return Sum.apply(self._flatten(Sum.apply), 0)
         else:
-            return Sum.apply(self, self._ensure_tensor(dim))
+            return Sum.apply(self, dim)
+
+    def _flatten(self, reduce: Callable[[Tensor, int], Tensor]) -> Tensor:
+        """All values in one dimension, for reductions over the whole tensor.
+
+        This is a view when the strides allow one. Otherwise `reduce` folds
+        away leading dimensions until they do, rather than copying the input.
+        """
+        t = self
+        for d in range(self.dims - 1):
+            if view_strides(t.shape, t._tensor.strides, (t.size,)) is not None:
+                break
+            t = reduce(t, d)
+        return t.view(t.size)
 
     def mean(self, dim: int | None = None) -> Tensor:
         """Computes mean over a specified axis or all contained values if not provided"""
@@ -391,8 +632,8 @@ class Tensor:
 
     def permute(self, *order: int) -> Tensor:
         """Permutes data reordering axes in manner specified"""
-        return Permute.apply(self, tensor(order))
+        return Permute.apply(self, order)
 
     def view(self, *shape: int) -> Tensor:
         """Imposes new shape in manner specified"""
-        return View.apply(self, tensor(shape))
+        return View.apply(self, shape)
@@ -1,21 +1,42 @@
 from __future__ import annotations
 
 import collections
+import functools
 import random
 import itertools
-from typing import Iterable, Optional, Sequence, Tuple, Union
+import weakref
+from typing import (
+    Any,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import numba
 import numba.cuda
 import numpy as np
 import numpy.typing as npt
 from numpy import array, float64
+from numpy.lib.stride_tricks import as_strided
 from typing_extensions import TypeAlias
 
 from .operators import prod
 
 MAX_DIMS = 32
 
+# Tensors larger than this are summarized when printed, keeping
+# PRINT_EDGEITEMS entries at each end of every long dimension.
+PRINT_THRESHOLD = 1000
+PRINT_EDGEITEMS = 3
+
+# `TensorData.indices` converts this many ordinals at a time.
+INDICES_CHUNK = 4096
+
 
 class IndexingError(RuntimeError):
     """Exception raised for indexing errors."""
@@ -23,7 +44,7 @@ class IndexingError(RuntimeError):
     pass
 
 
-Storage: TypeAlias = npt.NDArray[np.float64]
+Storage: TypeAlias = npt.NDArray[Any]
 OutIndex: TypeAlias = npt.NDArray[np.int32]
 Index: TypeAlias = npt.NDArray[np.int32]
 Shape: TypeAlias = npt.NDArray[np.int32]
@@ -32,6 +53,48 @@ Strides: TypeAlias = npt.NDArray[np.int32]
 UserIndex: TypeAlias = Sequence[int]
 UserShape: TypeAlias = Sequence[int]
 UserStrides: TypeAlias = Sequence[int]
+Positions: TypeAlias = npt.NDArray[np.intp]
+
+
+# Element types a storage may hold. float64 is the default everywhere.
+DTYPES = tuple(
+    np.dtype(t) for t in (np.float64, np.float32, np.float16, np.int32, np.bool_)
+)
+
+
+def storage_dtype(dtype: npt.DTypeLike) -> np.dtype:
+    """Normalize `dtype`, checking that it is one of `DTYPES`."""
+    dtype = np.dtype(dtype)
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported dtype {dtype}, expected one of {DTYPES}.")
+    return dtype
+
+
+def result_dtype(*args: Any) -> np.dtype:
+    """Dtype combining `args` (dtypes or Python numbers) by NumPy promotion.
+
+    Python numbers do not widen a dtype that can hold them. Results outside
+    `DTYPES` (e.g. bool with int) become float64.
+    """
+    dtype = np.result_type(*args)
+    return dtype if dtype in DTYPES else np.dtype(float64)
+
+
+def float_dtype(dtype: npt.DTypeLike) -> np.dtype:
+    """Dtype of float-valued functions (exp, sigmoid, ...) of `dtype`.
+
+    Floating dtypes are kept, bool and int32 become float64.
+    """
+    return result_dtype(dtype, 1.0)
+
+
+def sum_dtype(dtype: npt.DTypeLike) -> np.dtype:
+    """Dtype of sums over `dtype`.
+
+    Like NumPy, sums of bools count in the integer type, here int32.
+    """
+    dtype = np.dtype(dtype)
+    return np.dtype(np.int32) if dtype == np.bool_ else dtype
 
 
 def index_to_position(index: Index, strides: Strides) -> int:
@@ -48,7 +111,10 @@ def index_to_position(index: Index, strides: Strides) -> int:
         Position in storage
 
     """
-    return sum(i * s for i, s in zip(index, strides))
+    position = 0
+    for i in range(len(strides)):
+        position += index[i] * strides[i]
+    return position
 
 
 def to_index(ordinal: int, shape: Shape, out_index: OutIndex) -> None:
@@ -64,10 +130,11 @@ def to_index(ordinal: int, shape: Shape, out_index: OutIndex) -> None:
         out_index : return index corresponding to position.
 
     """
-    posn = np.flip(shape)
-    lens = np.append(1, np.cumprod(posn)[:-1])
-
-    out_index[::-1] = (ordinal // lens) % posn
+    # Copy rather than alias `ordinal`: NUMBA rejects writes to a prange index.
+    cur = ordinal + 0
+    for i in range(len(shape) - 1, -1, -1):
+        out_index[i] = cur % shape[i]
+        cur = cur // shape[i]
 
 
 def broadcast_index(
@@ -91,7 +158,34 @@ def broadcast_index(
         None
 
     """
-    out_index[:] = np.where(shape > 1, big_index[-len(shape) :], 0)
+    offset = len(big_shape) - len(shape)
+    for i in range(len(shape)):
+        if shape[i] > 1:
+            out_index[i] = big_index[i + offset]
+        else:
+            out_index[i] = 0
+
+
+def to_indices(ordinals: Positions, shape: UserShape) -> Positions:
+    """Batched `to_index`: convert an array of ordinals to indices in `shape`.
+
+    Args:
+    ----
+        ordinals : ordinal positions to convert
+        shape : tensor shape
+
+    Returns:
+    -------
+        Array of shape `(len(ordinals), len(shape))` whose rows are the
+        indices `to_index` gives for each ordinal.
+
+    """
+    ordinals = np.asarray(ordinals, dtype=np.intp)
+    indices = np.empty((len(ordinals), len(shape)), dtype=np.intp)
+    cur = ordinals.copy()
+    for i in range(len(shape) - 1, -1, -1):
+        cur, indices[:, i] = np.divmod(cur, shape[i])
+    return indices
 
 
 def shape_broadcast(shape1: UserShape, shape2: UserShape) -> UserShape:
@@ -132,6 +226,450 @@ def strides_from_shape(shape: UserShape) -> UserStrides:
     return tuple(reversed(layout[:-1]))
 
 
+def is_c_contiguous(shape: UserShape, strides: UserStrides) -> bool:
+    """True if `strides` lay `shape` out in row-major order with no gaps.
+
+    Strides of size-1 dimensions are ignored, as they are never used.
+    """
+    expected = 1
+    for sh, st in zip(reversed(shape), reversed(strides)):
+        if sh != 1 and st != expected:
+            return False
+        expected *= sh
+    return True
+
+
+def view_strides(
+    shape: UserShape, strides: UserStrides, new_shape: UserShape
+) -> Optional[UserStrides]:
+    """Strides to view a layout as `new_shape` without moving any data.
+
+    Each group of old dimensions that multiplies out to a group of new
+    dimensions must be contiguous with itself; strides between groups and
+    size-1 dimensions are unconstrained.
+
+    Args:
+    ----
+        shape : shape of the tensor
+        strides : strides of the tensor
+        new_shape : shape to view it as, with the same size
+
+    Returns:
+    -------
+        Strides for `new_shape`, or None if the view needs a copy.
+
+    """
+    old = [(sh, st) for sh, st in zip(shape, strides) if sh != 1]
+    new_strides = list(strides_from_shape(new_shape))
+    if prod(shape) == 0:
+        return tuple(new_strides)
+
+    oi = ni = 0
+    while oi < len(old) and ni < len(new_shape):
+        old_size, new_size = old[oi][0], new_shape[ni]
+        oj, nj = oi + 1, ni + 1
+        while old_size != new_size:
+            if new_size < old_size:
+                new_size *= new_shape[nj]
+                nj += 1
+            else:
+                old_size *= old[oj][0]
+                oj += 1
+
+        for k in range(oi, oj - 1):
+            if old[k][1] != old[k + 1][0] * old[k + 1][1]:
+                return None
+
+        new_strides[nj - 1] = old[oj - 1][1]
+        for k in range(nj - 1, ni, -1):
+            new_strides[k - 1] = new_strides[k] * new_shape[k]
+        oi, ni = oj, nj
+    return tuple(new_strides)
+
+
+def as_array(storage: Storage, shape: Shape, strides: Strides) -> np.ndarray:
+    """View strided `storage` as an ndarray of `shape` without copying."""
+    return as_strided(
+        storage,
+        shape=tuple(int(s) for s in shape),
+        strides=tuple(int(s) * storage.itemsize for s in strides),
+    )
+
+
+def broadcast_positions(
+    out_shape: UserShape,
+    shape: UserShape,
+    strides: UserStrides,
+    lo: int = 0,
+    hi: Optional[int] = None,
+) -> Positions:
+    """Storage positions of a tensor broadcast to `out_shape`.
+
+    Args:
+    ----
+        out_shape : shape to broadcast to
+        shape : shape of the tensor (must broadcast to `out_shape`)
+        strides : strides of the tensor
+        lo : first ordinal of `out_shape` to cover
+        hi : end of the ordinals to cover (default: all of them)
+
+    Returns:
+    -------
+        Array with the storage position for every ordinal of `out_shape`
+        from `lo` to `hi`, in the same order `to_index` enumerates them.
+
+    """
+    size = int(prod(out_shape))
+    hi = size if hi is None else hi
+    if not out_shape or size == 0:
+        return np.zeros(size, dtype=np.intp)[lo:hi]
+
+    # Only the rows of the first dimension holding `lo` to `hi` are built.
+    inner = size // out_shape[0]
+    first, last = lo // inner, -(-hi // inner)
+    positions = np.zeros((last - first, *out_shape[1:]), dtype=np.intp)
+    offset = len(out_shape) - len(shape)
+    for i in range(len(shape)):
+        if shape[i] > 1:
+            view = [1] * len(out_shape)
+            steps = np.arange(first, last) if i + offset == 0 else np.arange(shape[i])
+            view[i + offset] = len(steps)
+            positions += (steps * strides[i]).reshape(view)
+    start = first * inner
+    return positions.reshape(-1)[lo - start : hi - start]
+
+
+def broadcast_strides(
+    out_shape: UserShape, shape: UserShape, strides: UserStrides
+) -> Tuple[int, ...]:
+    """Strides of a tensor broadcast to `out_shape`, 0 along broadcast dimensions."""
+    offset = len(out_shape) - len(shape)
+    return (0,) * offset + tuple(
+        int(st) if sh > 1 else 0 for sh, st in zip(shape, strides)
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def coalesce(
+    shape: Tuple[int, ...], *strides: Tuple[int, ...]
+) -> Tuple[Tuple[int, ...], ...]:
+    """Simplify a loop nest over `shape` shared by operands with `strides`.
+
+    Size-1 dimensions are dropped, the rest are ordered so the innermost
+    dimension has the smallest strides, and neighbours are merged whenever
+    they are contiguous with each other in every operand. The result visits
+    the same pairs of positions, in a different order.
+
+    Args:
+    ----
+        shape : shape of the loop nest
+        *strides : strides of each operand (use `broadcast_strides` first)
+
+    Returns:
+    -------
+        New shape followed by the new strides of each operand.
+
+    """
+    dims = [d for d in range(len(shape)) if shape[d] != 1]
+    dims.sort(key=lambda d: -sum(abs(st[d]) for st in strides))
+
+    new_shape: list = []
+    new_strides: list = [[] for _ in strides]
+    for d in dims:
+        if new_shape and all(
+            ns[-1] == st[d] * shape[d] for ns, st in zip(new_strides, strides)
+        ):
+            new_shape[-1] *= shape[d]
+            for ns, st in zip(new_strides, strides):
+                ns[-1] = st[d]
+        else:
+            new_shape.append(shape[d])
+            for ns, st in zip(new_strides, strides):
+                ns.append(st[d])
+
+    if not new_shape:
+        return ((1,),) + tuple((0,) for _ in strides)
+    return (tuple(new_shape),) + tuple(tuple(ns) for ns in new_strides)
+
+
+class PlanCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+    max_bytes: int
+    currbytes: int
+
+
+class IndexPlanCache:
+    """LRU cache of index plans for the tensor kernels.
+
+    A plan holds precomputed storage positions for every output element
+    (and, for reduce, every reduced element), keyed on the shapes and
+    strides of the operands. With a plan a kernel becomes one gather,
+    one compute pass and one scatter.
+
+    A plan takes a few machine words per element, so large tensors have
+    large plans. Least recently used plans are evicted once there are more
+    than `maxsize` of them or they take more than `max_bytes`; a plan
+    larger than `max_bytes` on its own is used once and not kept.
+
+    Attributes
+    ----------
+        maxsize : maximum number of plans kept
+        max_bytes : cap on the bytes held by the kept plans
+        nbytes : bytes held by the kept plans
+        hits : number of lookups served from the cache
+        misses : number of plans that had to be built
+
+    """
+
+    def __init__(self, maxsize: int = 128, max_bytes: int = 1 << 28):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._plans: collections.OrderedDict[Hashable, Tuple[Positions, ...]] = (
+            collections.OrderedDict()
+        )
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[Positions, ...]]:
+        plan = self._plans.get(key)
+        if plan is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._plans.move_to_end(key)
+        return plan
+
+    def _store(self, key: Hashable, plan: Tuple[Positions, ...]) -> None:
+        for positions in plan:
+            positions.setflags(write=False)
+        size = sum(positions.nbytes for positions in plan)
+        if size > self.max_bytes:
+            return
+        self._plans[key] = plan
+        self.nbytes += size
+        while len(self._plans) > self.maxsize or self.nbytes > self.max_bytes:
+            _, old = self._plans.popitem(last=False)
+            self.nbytes -= sum(positions.nbytes for positions in old)
+
+    def positions(
+        self,
+        out_shape: Shape,
+        out_strides: Strides,
+        *operands: Tuple[Shape, Strides],
+        span: Optional[Tuple[int, int]] = None,
+    ) -> Tuple[Positions, ...]:
+        """Plan for an elementwise kernel (map, zip).
+
+        Args:
+        ----
+            out_shape : shape of the output
+            out_strides : strides of the output
+            *operands : (shape, strides) of each input, broadcast to `out_shape`
+            span : only build entries `lo` to `hi` of the plan, for one
+                chunk of a kernel split across workers; not cached
+
+        Returns:
+        -------
+            Storage positions of the output followed by those of each input,
+            one entry per output element. Entries are in loop order (see
+            `coalesce`), not necessarily the row-major order of `out_shape`.
+
+        """
+        key = (
+            tuple(out_shape.tolist()),
+            tuple(out_strides.tolist()),
+            tuple((tuple(sh.tolist()), tuple(st.tolist())) for sh, st in operands),
+        )
+        plan = None if span is not None else self._lookup(key)
+        if plan is None:
+            # Walk a coalesced loop nest: fewer dimensions, and the
+            # gathers move through memory in stride order.
+            shape, *strides = coalesce(
+                key[0],
+                key[1],
+                *(broadcast_strides(key[0], sh, st) for sh, st in key[2]),
+            )
+            lo, hi = span if span is not None else (0, None)
+            plan = tuple(
+                broadcast_positions(shape, shape, st, lo, hi) for st in strides
+            )
+            if span is None:
+                self._store(key, plan)
+        return plan
+
+    def reduce_positions(
+        self,
+        out_shape: Shape,
+        out_strides: Strides,
+        a_shape: Shape,
+        a_strides: Strides,
+        reduce_dim: int,
+        span: Optional[Tuple[int, int]] = None,
+    ) -> Tuple[Positions, Positions]:
+        """Plan for a reduction over `reduce_dim`.
+
+        Args:
+        ----
+            out_shape : shape of the output (`a_shape` with `reduce_dim` set to 1)
+            out_strides : strides of the output
+            a_shape : shape of the reduced tensor
+            a_strides : strides of the reduced tensor
+            reduce_dim : dimension to reduce
+            span : only build entries `lo` to `hi` of the plan, as in
+                `positions`; not cached
+
+        Returns:
+        -------
+            Output positions, shape `(out size,)`, and the positions reduced
+            into each of them, shape `(out size, a_shape[reduce_dim])`.
+
+        """
+        key = (
+            tuple(out_shape.tolist()),
+            tuple(out_strides.tolist()),
+            tuple(a_shape.tolist()),
+            tuple(a_strides.tolist()),
+            int(reduce_dim),
+        )
+        plan = None if span is not None else self._lookup(key)
+        if plan is None:
+            a_shape, a_strides = key[2], key[3]
+            # `reduce_dim` has size 1 in `out_shape`, so it drops out here.
+            shape, out_st, a_st = coalesce(key[0], key[1], a_strides)
+            lo, hi = span if span is not None else (0, None)
+            out_pos = broadcast_positions(shape, shape, out_st, lo, hi)
+            # Position of element 0 along `reduce_dim` for each output.
+            base = broadcast_positions(shape, shape, a_st, lo, hi)
+            step = np.arange(a_shape[reduce_dim]) * a_strides[reduce_dim]
+            plan = (out_pos, base[:, None] + step[None, :])
+            if span is None:
+                self._store(key, plan)
+        return plan  # type: ignore
+
+    def clear(self) -> None:
+        """Drop every plan and reset the counters."""
+        self._plans.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> PlanCacheInfo:
+        """Report cache statistics, like `functools.lru_cache`."""
+        return PlanCacheInfo(
+            self.hits,
+            self.misses,
+            self.maxsize,
+            len(self._plans),
+            self.max_bytes,
+            self.nbytes,
+        )
+
+
+index_plans = IndexPlanCache()
+
+
+class PoolInfo(NamedTuple):
+    hits: int
+    misses: int
+    pooled_bytes: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of pooled allocations served from a free list."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class StoragePool:
+    """Opt-in free lists of storage buffers, keyed by dtype and size class.
+
+    Forward and backward allocate the same output sizes every step. With
+    the pool enabled, `Tensor.zeros` rounds each request up to a power of
+    two and reuses a free buffer of that class. When the last array viewing
+    a buffer is collected, the buffer goes back on its free list unless
+    that would push the pooled total past `max_bytes`.
+
+    Attributes
+    ----------
+        enabled : allocate from the pool (off by default)
+        max_bytes : cap on bytes held in the free lists
+        min_size : requests below this many elements bypass the pool
+        hits : pooled allocations that reused a buffer
+        misses : pooled allocations that needed a new buffer
+
+    """
+
+    def __init__(
+        self, max_bytes: int = 1 << 28, min_size: int = 4096, enabled: bool = False
+    ):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.min_size = min_size
+        self.hits = 0
+        self.misses = 0
+        self.pooled_bytes = 0
+        self._free: collections.defaultdict[Tuple[str, int], List[Storage]] = (
+            collections.defaultdict(list)
+        )
+
+    def zeros(self, size: int, dtype: npt.DTypeLike = float64) -> Storage:
+        """Zero-filled storage of `size` elements of `dtype`.
+
+        Args:
+        ----
+            size : number of elements
+            dtype : element type
+
+        Returns:
+        -------
+            A 1-D array of exactly `size` elements. While enabled, it views a
+            pooled buffer that is recycled once the array is collected.
+
+        """
+        if not self.enabled or size < self.min_size:
+            return np.zeros(size, dtype)
+        dtype = np.dtype(dtype)
+        key = (dtype.str, 1 << (size - 1).bit_length())
+        free = self._free[key]
+        if free:
+            buffer = free.pop()
+            self.pooled_bytes -= buffer.nbytes
+            self.hits += 1
+        else:
+            buffer = np.empty(key[1], dtype)
+            self.misses += 1
+        buffer[:size] = 0
+        # Views of `out` keep `out` itself (not `buffer`) as their base, so
+        # `out` dies only once nothing can reach this part of `buffer`.
+        out = np.asarray(memoryview(buffer)[:size])
+        weakref.finalize(out, self._release, key, buffer).atexit = False
+        return out
+
+    def _release(self, key: Tuple[str, int], buffer: Storage) -> None:
+        if self.enabled and self.pooled_bytes + buffer.nbytes <= self.max_bytes:
+            self._free[key].append(buffer)
+            self.pooled_bytes += buffer.nbytes
+
+    def clear(self) -> None:
+        """Drop every pooled buffer and reset the counters."""
+        self._free.clear()
+        self.pooled_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> PoolInfo:
+        """Report pool statistics."""
+        return PoolInfo(self.hits, self.misses, self.pooled_bytes, self.max_bytes)
+
+
+storage_pool = StoragePool()
+
+
 class TensorData:
     _storage: Storage
     _strides: Strides
@@ -139,17 +677,27 @@ class TensorData:
     strides: UserStrides
     shape: UserShape
     dims: int
+    dtype: np.dtype
 
     def __init__(
         self,
         storage: Union[Sequence[float], Storage],
         shape: UserShape,
         strides: Optional[UserStrides] = None,
+        offset: int = 0,
+        dtype: Optional[npt.DTypeLike] = None,
     ):
-        if isinstance(storage, np.ndarray):
+        if isinstance(storage, np.ndarray) and dtype is None:
+            # Arrays of other dtypes (e.g. int64 from `np.arange`) convert
+            # as by `result_dtype`.
+            dtype = storage.dtype
+            if dtype not in DTYPES:
+                dtype = result_dtype(dtype)
+        if isinstance(storage, np.ndarray) and storage.dtype == dtype:
             self._storage = storage
         else:
-            self._storage = array(storage, dtype=float64)
+            self._storage = array(storage, dtype=float64 if dtype is None else dtype)
+        self.dtype = storage_dtype(self._storage.dtype)
 
         if strides is None:
             strides = strides_from_shape(shape)
@@ -164,7 +712,28 @@ class TensorData:
         self.dims = len(strides)
         self.size = int(prod(shape))
         self.shape = shape
-        assert len(self._storage) == self.size
+        self._offset = offset
+        # Number of storage positions from the first element to the last.
+        self._span = 0
+        if self.size > 0:
+            self._span = 1 + sum((sh - 1) * st for sh, st in zip(shape, strides))
+        if offset + self._span > len(self._storage):
+            raise IndexingError(f"Storage too small for {shape} at offset {offset}.")
+        self._contiguous = is_c_contiguous(shape, strides)
+
+    @staticmethod
+    def from_array(array: Storage) -> TensorData:
+        """Wrap an ndarray, such as an `np.memmap`, without copying.
+
+        The array must be contiguous in C or Fortran order and hold one of
+        `DTYPES`. Its strides carry over, so both orders are viewed in place.
+        """
+        if not (array.flags.c_contiguous or array.flags.f_contiguous):
+            raise ValueError("Array must be contiguous to be wrapped without a copy.")
+        storage_dtype(array.dtype)
+        storage = np.asarray(array).ravel(order="K")
+        strides = tuple(st // array.itemsize for st in array.strides)
+        return TensorData(storage, tuple(array.shape), strides)
 
     def to_cuda_(self) -> None:  # pragma: no cover
         """Convert to cuda"""
@@ -172,19 +741,14 @@ class TensorData:
             self._storage = numba.cuda.to_device(self._storage)
 
     def is_contiguous(self) -> bool:
-        """Check that the layout is contiguous, i.e. outer dimensions have bigger strides than inner dimensions.
+        """Check that the layout is contiguous, i.e. the storage holds the elements in row-major order.
 
         Returns
         -------
             bool : True if contiguous
 
         """
-        last = 1e9
-        for stride in self._strides:
-            if stride > last:
-                return False
-            last = stride
-        return True
+        return self._contiguous
 
     @staticmethod
     def shape_broadcast(shape_a: UserShape, shape_b: UserShape) -> UserShape:
@@ -192,7 +756,10 @@ class TensorData:
         return shape_broadcast(shape_a, shape_b)
 
     def index(self, index: Union[int, UserIndex]) -> int:
-        """Convert an `index` into a corresponding to position"""
+        """Convert an `index` into a corresponding to position
+
+        Negative entries count from the end of their dimension, as in Python.
+        """
         if isinstance(index, int):
             aindex: Index = array([index])
         else:  # if isinstance(index, tuple):
@@ -207,21 +774,19 @@ class TensorData:
         if aindex.shape[0] != len(self.shape):
             raise IndexingError(f"Index {aindex} must be size of {self.shape}.")
         for i, ind in enumerate(aindex):
-            if ind >= self.shape[i]:
+            if not -self.shape[i] <= ind < self.shape[i]:
                 raise IndexingError(f"Index {aindex} out of range {self.shape}.")
-            if ind < 0:
-                raise IndexingError(f"Negative indexing for {aindex} not supported.")
+        aindex = np.where(aindex < 0, aindex + np.asarray(self.shape), aindex)
 
         # Call fast indexing.
-        return index_to_position(array(index), self._strides)
+        return self._offset + index_to_position(aindex, self._strides)
 
     def indices(self) -> Iterable[UserIndex]:
         """Yields all possible indices of the data"""
-        lshape: Shape = array(self.shape)
-        out_index: Index = array(self.shape)
-        for i in range(self.size):
-            to_index(i, lshape, out_index)
-            yield tuple(out_index)
+        for lo in range(0, self.size, INDICES_CHUNK):
+            ordinals = np.arange(lo, min(lo + INDICES_CHUNK, self.size))
+            for index in to_indices(ordinals, self.shape).tolist():
+                yield tuple(index)
 
     def sample(self) -> UserIndex:
         """Get a random valid index"""
@@ -236,9 +801,19 @@ class TensorData:
         """Set value at specified key index to `val`"""
         self._storage[self.index(key)] = val
 
+    @property
+    def storage(self) -> Storage:
+        """The part of `_storage` this layout reaches, starting at `_offset`.
+
+        Positions computed from `strides` index into this (zero-copy) view.
+        """
+        if self._offset == 0 and self._span == len(self._storage):
+            return self._storage
+        return self._storage[self._offset : self._offset + self._span]
+
     def tuple(self) -> Tuple[Storage, Shape, Strides]:
         """Return core tensor data as a tuple."""
-        return (self._storage, self._shape, self._strides)
+        return (self.storage, self._shape, self._strides)
 
     def permute(self, *order: int) -> TensorData:
         """Permute the dimensions of the tensor.
@@ -260,29 +835,114 @@ class TensorData:
             self._storage,
             shape=tuple(self.shape[i] for i in order),
             strides=tuple(self.strides[i] for i in order),
+            offset=self._offset,
+        )
+
+    def slice(
+        self, starts: UserIndex, lengths: UserShape, steps: UserIndex
+    ) -> TensorData:
+        """View the elements at `starts[d] + steps[d] * i` for `i < lengths[d]`.
+
+        Args:
+        ----
+            starts: first index along each dimension
+            lengths: number of elements to keep along each dimension
+            steps: positive step between kept indices along each dimension
+
+        Returns:
+        -------
+            New `TensorData` with the same storage and a new offset, shape
+            and strides.
+
+        """
+        if not len(starts) == len(lengths) == len(steps) == self.dims:
+            raise IndexingError(f"Slice must give each dimension of {self.shape}.")
+        for size, start, length, step in zip(self.shape, starts, lengths, steps):
+            if step < 1 or length < 0 or start < 0:
+                raise IndexingError(f"Invalid slice {start}:{length}:{step}.")
+            if start + step * (length - 1) >= size and length > 0:
+                raise IndexingError(f"Slice {start}:{length}:{step} out of {size}.")
+
+        return TensorData(
+            self._storage,
+            shape=tuple(lengths),
+            strides=tuple(st * sp for st, sp in zip(self.strides, steps)),
+            offset=self._offset
+            + sum(st * start for st, start in zip(self.strides, starts)),
         )
 
-    def to_string(self) -> str:
-        """Convert to string"""
-        s = ""
-        for index in self.indices():
-            l = ""
-            for i in range(len(index) - 1, -1, -1):
-                if index[i] == 0:
-                    l = "\n%s[" % ("\t" * i) + l
-                else:
-                    break
-            s += l
-            v = self.get(index)
-            s += f"{v:3.2f}"
-            l = ""
-            for i in range(len(index) - 1, -1, -1):
-                if index[i] == self.shape[i] - 1:
-                    l += "]"
-                else:
-                    break
-            if l:
-                s += l
+    def broadcast_to(self, shape: UserShape) -> TensorData:
+        """View the tensor broadcast to `shape`, with stride 0 along broadcast dimensions.
+
+        Args:
+        ----
+            shape: shape that `self.shape` broadcasts to
+
+        Returns:
+        -------
+            New `TensorData` with the same storage; no values are copied.
+
+        """
+        if shape_broadcast(self.shape, shape) != tuple(shape):
+            raise IndexingError(f"Cannot broadcast {self.shape} to {shape}.")
+        return TensorData(
+            self._storage,
+            tuple(shape),
+            broadcast_strides(shape, self.shape, self.strides),
+            offset=self._offset,
+        )
+
+    def narrow(self, dim: int, start: int, length: int) -> TensorData:
+        """View `length` elements of dimension `dim` starting at `start`."""
+        starts = [0] * self.dims
+        lengths = list(self.shape)
+        starts[dim], lengths[dim] = start, length
+        return self.slice(tuple(starts), tuple(lengths), (1,) * self.dims)
+
+    def to_string(
+        self, threshold: int = PRINT_THRESHOLD, edgeitems: int = PRINT_EDGEITEMS
+    ) -> str:
+        """Convert to string.
+
+        Tensors with more than `threshold` elements are summarized: only the
+        first and last `edgeitems` entries of each long dimension are shown,
+        with "..." in between. Values are gathered and formatted in one
+        vectorized pass over the printed elements only.
+
+        Args:
+        ----
+            threshold: largest size printed in full.
+            edgeitems: entries kept at each end of a summarized dimension.
+
+        Returns:
+        -------
+            The formatted tensor.
+
+        """
+        if self.size == 0 or len(self.shape) == 0:
+            return "[]"
+        summarize = self.size > threshold
+        keep = []
+        for n in self.shape:
+            if summarize and n > 2 * edgeitems:
+                keep.append(np.r_[0:edgeitems, n - edgeitems : n])
             else:
-                s += " "
-        return s
+                keep.append(np.arange(n))
+        positions = self._offset + sum(
+            ix * s for ix, s in zip(np.ix_(*keep), self._strides)
+        )
+        cells = np.char.mod("%3.2f", self._storage[positions].astype(np.float64))
+
+        def block(dim: int, cells: npt.NDArray[np.str_]) -> str:
+            cut = len(cells) < self.shape[dim]
+            if dim == self.dims - 1:
+                items = cells.tolist()
+                if cut:
+                    items.insert(edgeitems, "...")
+                return "\n%s[%s]" % ("\t" * dim, " ".join(items))
+            rows = [block(dim + 1, c) for c in cells]
+            if cut:
+                rows.insert(edgeitems, "\n%s..." % ("\t" * (dim + 1)))
+            return "\n%s[%s]" % ("\t" * dim, "".join(rows))
+
+        return block(0, cells)
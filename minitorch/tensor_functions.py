@@ -9,12 +9,23 @@ import numpy as np
 
 import minitorch
 
-from . import operators
+from . import fusion, operators
 from .autodiff import Context
+from .tensor_data import (
+    TensorData,
+    as_array,
+    result_dtype,
+    storage_dtype,
+    storage_pool,
+    strides_from_shape,
+    view_strides,
+)
 from .tensor_ops import SimpleBackend, TensorBackend
 
 if TYPE_CHECKING:
-    from typing import Any, List, Tuple
+    from typing import Any, Optional, Tuple
+
+    import numpy.typing as npt
 
     from .tensor import Tensor
     from .tensor_data import UserIndex, UserShape
@@ -34,24 +45,34 @@ class Function:
         return wrap_tuple(cls.backward(ctx, grad_out))  # type: ignore
 
     @classmethod
-    def _forward(cls, ctx: Context, *inps: Tensor) -> Tensor:
+    def _forward(cls, ctx: Context, *inps: Any) -> Tensor:
         return cls.forward(ctx, *inps)  # type: ignore
 
     @classmethod
-    def apply(cls, *vals: Tensor) -> Tensor:
-        """Call the forward function and track history"""
-        raw_vals = []
+    def apply(cls, *vals: Any) -> Tensor:
+        """Call the forward function and track history.
+
+        Arguments that are not tensors (shapes, dims, permutation orders,
+        Python numbers) are passed to `forward` unchanged and take no part
+        in autodiff: `backward` returns one gradient per tensor argument.
+
+        Tensors are passed as they are, not detached: `forward` only runs
+        backend kernels on them, and its result is rewrapped below with
+        the history of this call.
+        """
+        inputs = []
         need_grad = False
         for v in vals:
-            if v.requires_grad():
-                need_grad = True
-            raw_vals.append(v.detach())
+            if isinstance(v, minitorch.Tensor):
+                if v.history is not None:
+                    need_grad = True
+                inputs.append(v)
 
         # Create the context.
         ctx = Context(not need_grad)
 
         # Call forward with the variables.
-        c = cls._forward(ctx, *raw_vals)
+        c = cls._forward(ctx, *vals)
         # assert isinstance(c, Tensor), "Expected return type Tensor got %s" % (
         #     type(c)
         # )
@@ -59,7 +80,8 @@ class Function:
         # Create a new variable from the result with a new history.
         back = None
         if need_grad:
-            back = minitorch.History(cls, ctx, vals)
+            back = minitorch.History(cls, ctx, inputs)
+            fusion.keep(*ctx.saved_values)
         return minitorch.Tensor(c._tensor, back, backend=c.backend)
 
 
@@ -81,43 +103,88 @@ class View(Function):
     """View function imposing new shape"""
 
     @staticmethod
-    def forward(ctx: Context, a: Tensor, shape: Tensor) -> Tensor:
+    def forward(ctx: Context, a: Tensor, shape: UserShape) -> Tensor:
         """Invoke view function saving arguments into context as necessary"""
         ctx.save_for_backward(a.shape)
-        assert a._tensor.is_contiguous(), "Must be contiguous to view"
-        shape2 = [int(shape[i]) for i in range(shape.size)]
-        return minitorch.Tensor.make(
-            a._tensor._storage, tuple(shape2), backend=a.backend
+        shape2 = tuple(shape)
+        assert operators.prod(shape2) == a.size, f"Cannot view {a.shape} as {shape2}"
+        strides = view_strides(a.shape, a._tensor.strides, shape2)
+        assert strides is not None, "Must be contiguous to view"
+        return a._new(
+            TensorData(a._tensor._storage, shape2, strides, offset=a._tensor._offset)
         )
 
     @staticmethod
-    def backward(ctx: Context, grad_output: Tensor) -> Tuple[Tensor, float]:
+    def backward(ctx: Context, grad_output: Tensor) -> Tensor:
         """Matrix Multiply backward (module 3)"""
         (original,) = ctx.saved_values
-        return (
-            minitorch.Tensor.make(
-                grad_output._tensor._storage, original, backend=grad_output.backend
-            ),
-            0.0,
+        strides = view_strides(grad_output.shape, grad_output._tensor.strides, original)
+        if strides is None:
+            grad_output = grad_output.f.id_map(grad_output)
+            strides = strides_from_shape(original)
+        grad = TensorData(
+            grad_output._tensor._storage,
+            original,
+            strides,
+            offset=grad_output._tensor._offset,
         )
+        return grad_output._new(grad)
+
+
+class Slice(Function):
+    """View of a regularly spaced block of elements, see `TensorData.slice`"""
+
+    @staticmethod
+    def forward(
+        ctx: Context,
+        a: Tensor,
+        starts: UserIndex,
+        lengths: UserShape,
+        steps: UserShape,
+    ) -> Tensor:
+        """Invoke slice function saving arguments into context as necessary"""
+        ctx.save_for_backward(a.shape, starts, lengths, steps)
+        return a._new(a._tensor.slice(tuple(starts), tuple(lengths), tuple(steps)))
+
+    @staticmethod
+    def backward(ctx: Context, grad_output: Tensor) -> Tensor:
+        """Scatter the gradient into zeros shaped like the input"""
+        shape, starts, lengths, steps = ctx.saved_values
+        grad = grad_output.zeros(shape)
+        block = grad._tensor.slice(tuple(starts), tuple(lengths), tuple(steps))
+        grad_output.f.id_map(grad_output, grad._new(block))
+        return grad
+
+
+class BroadcastTo(Function):
+    """View broadcasting a tensor to a larger shape, see `TensorData.broadcast_to`"""
+
+    @staticmethod
+    def forward(ctx: Context, a: Tensor, shape: UserShape) -> Tensor:
+        """Invoke broadcast function saving arguments into context as necessary"""
+        return a._new(a._tensor.broadcast_to(tuple(shape)))
+
+    @staticmethod
+    def backward(ctx: Context, grad_output: Tensor) -> Tensor:
+        """Pass the gradient through; `Tensor.expand` sums the broadcast dimensions"""
+        return grad_output
 
 
 class Permute(Function):
     """Permutation function swapping axis order"""
 
     @staticmethod
-    def forward(ctx: Context, t1: Tensor, order: Tensor) -> Tensor:
+    def forward(ctx: Context, t1: Tensor, order: UserIndex) -> Tensor:
         """Invoke permutation function saving arguments into context as necessary"""
         ctx.save_for_backward(order)
-        return t1._new(t1._tensor.permute(*(order.to_numpy().astype(int))))
+        return t1._new(t1._tensor.permute(*order))
 
     @staticmethod
-    def backward(ctx: Context, grad_output: Tensor) -> Tuple[Tensor, Tensor]:
+    def backward(ctx: Context, grad_output: Tensor) -> Tensor:
         """Compute permutation derivative on arguments in context, scaled by arbitrary input"""
         (order,) = ctx.saved_values
-        return grad_output._new(
-            grad_output._tensor.permute(*np.argsort(order.to_numpy().astype(int)))
-        ), grad_output._ensure_tensor(0.0)
+        inverse = np.argsort(order).tolist()
+        return grad_output._new(grad_output._tensor.permute(*inverse))
 
 
 class Neg(Function):
@@ -179,7 +246,7 @@ class Exp(Function):
     def backward(ctx: Context, grad_output: Tensor) -> Tensor:
         """Compute exponential derivative on arguments in context, scaled by arbitrary input"""
         (t1,) = ctx.saved_values
-        return grad_output.f.mul_zip(t1.f.exp_map(t1), grad_output)
+        return grad_output.f.exp_back_zip(t1, grad_output)
 
 
 class ReLU(Function):
@@ -211,13 +278,7 @@ class Sigmoid(Function):
     def backward(ctx: Context, grad_out: Tensor) -> Tensor:
         """Compute sigmoid derivative on arguments in context, scaled by arbitrary input"""
         (t1,) = ctx.saved_values
-        sig = t1.f.sigmoid_map(t1)
-        return sig.f.mul_zip(
-            sig.f.mul_zip(
-                sig, sig.f.add_zip(sig._ensure_tensor(1), sig.f.neg_map(sig))
-            ),
-            grad_out,
-        )
+        return grad_out.f.sigmoid_back_zip(t1, grad_out)
 
 
 class Add(Function):
@@ -252,6 +313,36 @@ class Mul(Function):
         )
 
 
+class AddScalar(Function):
+    """Addition of a Python number $f(x) = x + c$"""
+
+    @staticmethod
+    def forward(ctx: Context, t1: Tensor, c: float) -> Tensor:
+        """Invoke the scalar addition kernel"""
+        return t1.f.add_scalar(t1, c)
+
+    @staticmethod
+    def backward(ctx: Context, grad_output: Tensor) -> Tensor:
+        """Compute addition derivative on arguments in context, scaled by arbitrary input"""
+        return grad_output
+
+
+class MulScalar(Function):
+    """Multiplication by a Python number $f(x) = x * c$"""
+
+    @staticmethod
+    def forward(ctx: Context, t1: Tensor, c: float) -> Tensor:
+        """Invoke the scalar multiplication kernel saving `c` into context"""
+        ctx.save_for_backward(c)
+        return t1.f.mul_scalar(t1, c)
+
+    @staticmethod
+    def backward(ctx: Context, grad_output: Tensor) -> Tensor:
+        """Compute multiplication derivative on arguments in context, scaled by arbitrary input"""
+        (c,) = ctx.saved_values
+        return grad_output.f.mul_scalar(grad_output, c)
+
+
 class MatMul(Function):
     @staticmethod
     def forward(ctx: Context, t1: Tensor, t2: Tensor) -> Tensor:
@@ -287,7 +378,9 @@ class EQ(Function):
     @staticmethod
     def backward(ctx: Context, grad_out: Tensor) -> Tuple[Tensor, Tensor]:
         """Compute equal to derivative on arguments in context, scaled by arbitrary input"""
-        return grad_out.zeros(), grad_out.zeros()
+        # A single zero: `Tensor.expand` broadcasts it as a stride-0 view.
+        zero = grad_out.zeros((1,))
+        return zero, zero
 
 
 class LT(Function):
@@ -302,7 +395,9 @@ class LT(Function):
     @staticmethod
     def backward(ctx: Context, grad_out: Tensor) -> Tuple[Tensor, Tensor]:
         """Compute less than derivative on arguments in context, scaled by arbitrary input"""
-        return grad_out.zeros(), grad_out.zeros()
+        # A single zero: `Tensor.expand` broadcasts it as a stride-0 view.
+        zero = grad_out.zeros((1,))
+        return zero, zero
 
 
 class IsClose(Function):
@@ -319,10 +414,10 @@ class All(Function):
     """All function returning truthiness along a specified axis or all contained values if not provided"""
 
     @staticmethod
-    def forward(ctx: Context, a: Tensor, dim: Tensor) -> Tensor:
+    def forward(ctx: Context, a: Tensor, dim: Optional[int]) -> Tensor:
         """Return 1 if all are true"""
         if dim is not None:
-            return a.f.mul_reduce(a, int(dim.item()))
+            return a.f.mul_reduce(a, dim)
         else:
             return a.f.mul_reduce(a.contiguous().view(int(operators.prod(a.shape))), 0)
 
@@ -331,24 +426,99 @@ class Sum(Function):
     """Sum function returning either sum along a specified axis or all contained values if not provided"""
 
     @staticmethod
-    def forward(ctx: Context, t1: Tensor, dim: Tensor) -> Tensor:
+    def forward(ctx: Context, t1: Tensor, dim: int) -> Tensor:
         """Invoke sum function saving arguments into context as necessary"""
-        return t1.f.add_reduce(t1, int(dim.item()))
+        return t1.f.add_reduce(t1, dim)
 
     @staticmethod
-    def backward(ctx: Context, grad_out: Tensor) -> Tuple[Tensor, Tensor]:
+    def backward(ctx: Context, grad_out: Tensor) -> Tensor:
         """Compute sum derivative on arguments in context, scaled by arbitrary input"""
-        return grad_out, grad_out._ensure_tensor(0.0)
+        return grad_out
 
 
 # Helpers for Constructing tensors
-def zeros(shape: UserShape, backend: TensorBackend = SimpleBackend) -> Tensor:
+
+# Generator used by `rand` when none is given, see `manual_seed`.
+_generator = np.random.default_rng()
+
+
+def manual_seed(seed: Optional[int] = None) -> np.random.Generator:
+    """Reseed the generator `rand` draws from by default and return it.
+
+    Args:
+    ----
+        seed : seed for `np.random.default_rng` (None for fresh entropy)
+
+    Returns:
+    -------
+        the new default generator
+
+    """
+    global _generator
+    _generator = np.random.default_rng(seed)
+    return _generator
+
+
+def empty(
+    shape: UserShape,
+    backend: TensorBackend = SimpleBackend,
+    dtype: npt.DTypeLike = np.float64,
+) -> Tensor:
+    """Produce an uninitialized tensor of size `shape`.
+
+    Args:
+    ----
+        shape : shape of tensor
+        backend : tensor backend
+        dtype : element type, one of `DTYPES`
+
+    Returns:
+    -------
+        new tensor, to be filled by the caller
+
+    """
+    return minitorch.Tensor.make(
+        np.empty(int(operators.prod(shape)), dtype), shape, backend=backend
+    )
+
+
+def full(
+    shape: UserShape,
+    value: float,
+    backend: TensorBackend = SimpleBackend,
+    dtype: npt.DTypeLike = np.float64,
+) -> Tensor:
+    """Produce a tensor of size `shape` with every element set to `value`.
+
+    Args:
+    ----
+        shape : shape of tensor
+        value : fill value
+        backend : tensor backend
+        dtype : element type, one of `DTYPES`
+
+    Returns:
+    -------
+        new tensor
+
+    """
+    return minitorch.Tensor.make(
+        np.full(int(operators.prod(shape)), value, dtype), shape, backend=backend
+    )
+
+
+def zeros(
+    shape: UserShape,
+    backend: TensorBackend = SimpleBackend,
+    dtype: npt.DTypeLike = np.float64,
+) -> Tensor:
     """Produce a zero tensor of size `shape`.
 
     Args:
     ----
         shape : shape of tensor
         backend : tensor backend
+        dtype : element type, one of `DTYPES`
 
     Returns:
     -------
@@ -356,30 +526,57 @@ def zeros(shape: UserShape, backend: TensorBackend = SimpleBackend) -> Tensor:
 
     """
     return minitorch.Tensor.make(
-        [0.0] * int(operators.prod(shape)), shape, backend=backend
+        storage_pool.zeros(int(operators.prod(shape)), dtype), shape, backend=backend
     )
 
 
+def ones(
+    shape: UserShape,
+    backend: TensorBackend = SimpleBackend,
+    dtype: npt.DTypeLike = np.float64,
+) -> Tensor:
+    """Produce a tensor of ones of size `shape`.
+
+    Args:
+    ----
+        shape : shape of tensor
+        backend : tensor backend
+        dtype : element type, one of `DTYPES`
+
+    Returns:
+    -------
+        new tensor
+
+    """
+    return full(shape, 1, backend=backend, dtype=dtype)
+
+
 def rand(
     shape: UserShape,
     backend: TensorBackend = SimpleBackend,
     requires_grad: bool = False,
+    dtype: npt.DTypeLike = np.float64,
+    generator: Optional[np.random.Generator] = None,
 ) -> Tensor:
-    """Produce a random tensor of size `shape`.
+    """Produce a random tensor of size `shape`, uniform on [0, 1).
 
     Args:
     ----
         shape : shape of tensor
         backend : tensor backend
         requires_grad : turn on autodifferentiation
+        dtype : element type, one of `DTYPES`
+        generator : source of randomness, defaults to the one set by
+            `manual_seed`
 
     Returns:
     -------
         :class:`Tensor` : new tensor
 
     """
-    vals = [random.random() for _ in range(int(operators.prod(shape)))]
-    tensor = minitorch.Tensor.make(vals, shape, backend=backend)
+    rng = _generator if generator is None else generator
+    vals = rng.random(int(operators.prod(shape)))
+    tensor = minitorch.Tensor.make(vals, shape, backend=backend, dtype=dtype)
     tensor.requires_grad_(requires_grad)
     return tensor
 
@@ -389,6 +586,7 @@ def _tensor(
     shape: UserShape,
     backend: TensorBackend = SimpleBackend,
     requires_grad: bool = False,
+    dtype: npt.DTypeLike = np.float64,
 ) -> Tensor:
     """Produce a tensor with data ls and shape `shape`.
 
@@ -398,49 +596,185 @@ def _tensor(
         shape: shape of tensor
         backend: tensor backend
         requires_grad: turn on autodifferentiation
+        dtype: element type, one of `DTYPES`
 
     Returns:
     -------
         new tensor
 
     """
-    tensor = minitorch.Tensor.make(ls, shape, backend=backend)
+    tensor = minitorch.Tensor.make(ls, shape, backend=backend, dtype=dtype)
     tensor.requires_grad_(requires_grad)
     return tensor
 
 
 def tensor(
-    ls: Any, backend: TensorBackend = SimpleBackend, requires_grad: bool = False
+    ls: Any,
+    backend: TensorBackend = SimpleBackend,
+    requires_grad: bool = False,
+    dtype: npt.DTypeLike = np.float64,
 ) -> Tensor:
     """Produce a tensor with data and shape from ls
 
+    `ls` is copied into new row-major storage with a single `np.array` call,
+    so nested sequences are converted in C rather than flattened in Python.
+
     Args:
     ----
-        ls: data for tensor
+        ls: data for tensor, a nested (uniform) sequence of numbers, an
+            ndarray, or anything else `np.array` accepts
         backend : tensor backend
         requires_grad : turn on autodifferentiation
+        dtype : element type, one of `DTYPES`
 
     Returns:
     -------
         :class:`Tensor` : new tensor
 
     """
+    values = np.array(ls, dtype=storage_dtype(dtype), order="C")
+    return _tensor(
+        values.ravel(),
+        values.shape,
+        backend=backend,
+        requires_grad=requires_grad,
+        dtype=dtype,
+    )
 
-    def shape(ls: Any) -> List[int]:
-        if isinstance(ls, (list, tuple)):
-            return [len(ls)] + shape(ls[0])
-        else:
-            return []
 
-    def flatten(ls: Any) -> List[float]:
-        if isinstance(ls, (list, tuple)):
-            return [y for x in ls for y in flatten(x)]
-        else:
-            return [ls]
+def from_numpy(
+    array: npt.NDArray[Any],
+    backend: TensorBackend = SimpleBackend,
+    requires_grad: bool = False,
+) -> Tensor:
+    """Produce a tensor sharing memory with the ndarray `array`.
+
+    C- and Fortran-contiguous arrays of one of `DTYPES` are wrapped without
+    a copy, so writes through either side are seen by the other. Other
+    arrays are copied into row-major storage first, and dtypes outside
+    `DTYPES` (e.g. int64) are converted as by `result_dtype`.
+
+    Args:
+    ----
+        array: data for tensor
+        backend: tensor backend
+        requires_grad: turn on autodifferentiation
+
+    Returns:
+    -------
+        :class:`Tensor` : new tensor
+
+    """
+    array = np.asarray(array)
+    dtype = result_dtype(array.dtype)
+    if array.dtype != dtype or not (
+        array.flags.c_contiguous or array.flags.f_contiguous
+    ):
+        array = np.ascontiguousarray(array, dtype=dtype)
+    tensor = minitorch.Tensor(TensorData.from_array(array), backend=backend)
+    tensor.requires_grad_(requires_grad)
+    return tensor
+
+
+def from_dlpack(
+    x: Any, backend: TensorBackend = SimpleBackend, requires_grad: bool = False
+) -> Tensor:
+    """Produce a tensor sharing memory with any DLPack producer on the CPU
+    (a torch tensor, an ndarray, another minitorch tensor, ...).
+
+    Args:
+    ----
+        x: object implementing `__dlpack__`
+        backend: tensor backend
+        requires_grad: turn on autodifferentiation
+
+    Returns:
+    -------
+        :class:`Tensor` : new tensor
+
+    """
+    return from_numpy(np.from_dlpack(x), backend=backend, requires_grad=requires_grad)
+
+
+# Tensors backed by files
+
+
+def memmap(
+    filename: str,
+    shape: UserShape,
+    mode: str = "r",
+    backend: TensorBackend = SimpleBackend,
+    requires_grad: bool = False,
+    dtype: npt.DTypeLike = np.float64,
+) -> Tensor:
+    """Produce a tensor over a raw file of values, without reading it.
+
+    Args:
+    ----
+        filename: path of the file
+        shape: shape of the tensor, in row-major order
+        mode: `np.memmap` mode, "r" (read-only), "r+" (writes go to the
+            file), "w+" (create or overwrite) or "c" (copy-on-write)
+        backend: tensor backend
+        requires_grad: turn on autodifferentiation
+        dtype: element type of the file, one of `DTYPES`
+
+    Returns:
+    -------
+        :class:`Tensor` : new tensor
+
+    """
+    array = np.memmap(filename, dtype=dtype, mode=mode, shape=tuple(shape))
+    tensor = minitorch.Tensor(TensorData.from_array(array), backend=backend)
+    tensor.requires_grad_(requires_grad)
+    return tensor
+
+
+def save(t: Tensor, filename: str) -> None:
+    """Write `t` to an `.npy` file that `load` can map back in constant time.
 
-    cur = flatten(ls)
-    shape2 = shape(ls)
-    return _tensor(cur, tuple(shape2), backend=backend, requires_grad=requires_grad)
+    Values are written in row-major order whatever the layout of `t`, so
+    the file is also a plain NumPy array.
+
+    Args:
+    ----
+        t: tensor to save
+        filename: path of the file (no extension is added)
+
+    """
+    out = np.lib.format.open_memmap(filename, mode="w+", dtype=t.dtype, shape=t.shape)
+    out[...] = as_array(*t.tuple())
+    out.flush()
+
+
+def load(
+    filename: str,
+    mode: str = "r",
+    backend: TensorBackend = SimpleBackend,
+    requires_grad: bool = False,
+) -> Tensor:
+    """Map a tensor written by `save` (or any `.npy` file of `DTYPES`) into memory.
+
+    Nothing is read up front; pages are loaded as kernels touch them, so
+    data sets and checkpoints larger than RAM can be used directly.
+
+    Args:
+    ----
+        filename: path of the `.npy` file
+        mode: `np.memmap` mode, "r" (read-only), "r+" (writes go to the
+            file) or "c" (copy-on-write)
+        backend: tensor backend
+        requires_grad: turn on autodifferentiation
+
+    Returns:
+    -------
+        :class:`Tensor` : new tensor
+
+    """
+    array = np.load(filename, mmap_mode=mode)  # type: ignore
+    tensor = minitorch.Tensor(TensorData.from_array(array), backend=backend)
+    tensor.requires_grad_(requires_grad)
+    return tensor
 
 
 # Gradient check for tensors
@@ -1,18 +1,32 @@
 from __future__ import annotations
 
+import os
+
 import numpy as np
 
-from typing import TYPE_CHECKING, Callable, Optional, Type
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Type
 
 from typing_extensions import Protocol
 
-from . import operators
-from .tensor_data import broadcast_index, to_index, index_to_position, shape_broadcast
+from . import fusion, operators
+from .tensor_data import (
+    TensorData,
+    broadcast_positions,
+    float_dtype,
+    index_plans,
+    result_dtype,
+    shape_broadcast,
+    storage_dtype,
+    sum_dtype,
+)
 
 if TYPE_CHECKING:
     from .tensor import Tensor
     from .tensor_data import Shape, Storage, Strides
 
+# Dtype of a kernel's new output given the dtype of its inputs.
+DtypeRule = Callable[[np.dtype], np.dtype]
+
 
 class MapProto(Protocol):
     def __call__(self, x: Tensor, out: Optional[Tensor] = ..., /) -> Tensor:
@@ -20,23 +34,53 @@ class MapProto(Protocol):
         ...
 
 
+class ZipProto(Protocol):
+    def __call__(self, a: Tensor, b: Tensor, out: Optional[Tensor] = ..., /) -> Tensor:
+        """Call a zip function"""
+        ...
+
+
+class ScalarProto(Protocol):
+    def __call__(self, a: Tensor, c: float, out: Optional[Tensor] = ..., /) -> Tensor:
+        """Call a zip function against a constant"""
+        ...
+
+
+class ReduceProto(Protocol):
+    def __call__(self, a: Tensor, dim: int, out: Optional[Tensor] = ..., /) -> Tensor:
+        """Call a reduce function"""
+        ...
+
+
 class TensorOps:
     @staticmethod
-    def map(fn: Callable[[float], float]) -> MapProto:
+    def map(
+        fn: Callable[[float], float], out_dtype: DtypeRule = storage_dtype
+    ) -> MapProto:
         """Map placeholder"""
         ...
 
     @staticmethod
     def zip(
-        fn: Callable[[float, float], float],
-    ) -> Callable[[Tensor, Tensor], Tensor]:
+        fn: Callable[[float, float], float], out_dtype: DtypeRule = storage_dtype
+    ) -> ZipProto:
         """Zip placeholder"""
         ...
 
+    @staticmethod
+    def zip_scalar(
+        fn: Callable[[float, float], float],
+    ) -> ScalarProto:
+        """Zip against a constant placeholder"""
+        ...
+
     @staticmethod
     def reduce(
-        fn: Callable[[float, float], float], start: float = 0.0
-    ) -> Callable[[Tensor, int], Tensor]:
+        fn: Callable[[float, float], float],
+        start: float = 0.0,
+        summation: str = "naive",
+        out_dtype: DtypeRule = storage_dtype,
+    ) -> ReduceProto:
         """Reduce placeholder"""
         ...
 
@@ -45,17 +89,43 @@ class TensorOps:
         """Matrix multiply"""
         raise NotImplementedError("Not implemented in this assignment")
 
+    @staticmethod
+    def storage(values: Storage, threshold: int) -> Storage:
+        """Storage for a new tensor holding `values`, kept as they are by default.
+
+        `threshold` is the backend's, see `TensorBackend`.
+        """
+        return values
+
     cuda = False
 
 
 class TensorBackend:
-    def __init__(self, ops: Type[TensorOps]):
+    def __init__(
+        self,
+        ops: Type[TensorOps],
+        summation: str = "naive",
+        workers: Optional[int] = None,
+        threshold: int = 1 << 16,
+        fuse: bool = False,
+    ):
         """Dynamically construct a tensor backend based on a `tensor_ops` object
         that implements map, zip, and reduce higher-order functions.
 
         Args:
         ----
             ops : tensor operations object see `tensor_ops.py`
+            summation : accumulation scheme used by `add_reduce`, one of
+                `SUMMATIONS`. "pairwise" and "kahan" trade some speed for
+                much smaller rounding error on long sums.
+            workers : threads or processes a kernel may split its work
+                across (default: one per CPU). Used by `NumpyOps` and
+                `ProcessOps`; `FastOps` kernels are already parallel.
+            threshold : element count below which kernels stay on the
+                calling thread
+            fuse : capture maps and zips and run each chain of them as a
+                single fused kernel, see `fusion.lazy`. Off by default:
+                results then read their inputs when first used
 
 
         Returns:
@@ -63,14 +133,17 @@ class TensorBackend:
             A collection of tensor functions
 
         """
+        if fuse:
+            ops = fusion.lazy(ops)
+
         # Maps
         self.neg_map = ops.map(operators.neg)
-        self.sigmoid_map = ops.map(operators.sigmoid)
+        self.sigmoid_map = ops.map(operators.sigmoid, float_dtype)
         self.relu_map = ops.map(operators.relu)
-        self.log_map = ops.map(operators.log)
-        self.exp_map = ops.map(operators.exp)
+        self.log_map = ops.map(operators.log, float_dtype)
+        self.exp_map = ops.map(operators.exp, float_dtype)
         self.id_map = ops.map(operators.id)
-        self.inv_map = ops.map(operators.inv)
+        self.inv_map = ops.map(operators.inv, float_dtype)
 
         # Zips
         self.add_zip = ops.zip(operators.add)
@@ -78,20 +151,47 @@ class TensorBackend:
         self.lt_zip = ops.zip(operators.lt)
         self.eq_zip = ops.zip(operators.eq)
         self.is_close_zip = ops.zip(operators.is_close)
-        self.relu_back_zip = ops.zip(operators.relu_back)
-        self.log_back_zip = ops.zip(operators.log_back)
-        self.inv_back_zip = ops.zip(operators.inv_back)
+        self.relu_back_zip = ops.zip(operators.relu_back, float_dtype)
+        self.log_back_zip = ops.zip(operators.log_back, float_dtype)
+        self.inv_back_zip = ops.zip(operators.inv_back, float_dtype)
+
+        # Zips against a Python number, applied like maps
+        self.add_scalar = ops.zip_scalar(operators.add)
+        self.mul_scalar = ops.zip_scalar(operators.mul)
+
+        # 1-element tensors for Python numbers, see `Tensor._ensure_tensor`
+        self.constants: Dict[Tuple[str, str], Tensor] = {}
+
+        # Fused zips, one pass for a whole chain (see `fusion.py`)
+        self.sigmoid_back_zip = ops.zip(fusion.sigmoid_back, float_dtype)
+        self.exp_back_zip = ops.zip(fusion.exp_back, float_dtype)
 
         # Reduce
-        self.add_reduce = ops.reduce(operators.add, 0.0)
+        self.add_reduce = ops.reduce(operators.add, 0.0, summation, sum_dtype)
         self.mul_reduce = ops.reduce(operators.mul, 1.0)
         self.matrix_multiply = ops.matrix_multiply
+        self._storage = ops.storage
         self.cuda = ops.cuda
 
+        # Threading
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.threshold = threshold
+
+    def storage(self, values: Storage) -> Storage:
+        """Storage for a new tensor of this backend holding `values`"""
+        return self._storage(values, self.threshold)
+
+
+def kernel_workers(backend: TensorBackend, size: int) -> int:
+    """Workers `backend` allows for a kernel touching `size` elements."""
+    return backend.workers if size >= backend.threshold else 1
+
 
 class SimpleOps(TensorOps):
     @staticmethod
-    def map(fn: Callable[[float], float]) -> MapProto:
+    def map(
+        fn: Callable[[float], float], out_dtype: DtypeRule = storage_dtype
+    ) -> MapProto:
         """Higher-order tensor map function ::
 
           fn_map = map(fn)
@@ -113,6 +213,8 @@ class SimpleOps(TensorOps):
         Args:
         ----
             fn: function from float-to-float to apply.
+            out_dtype: dtype of a new output given the dtype of `a`,
+                e.g. `float_dtype` for functions with float values
             a (:class:`TensorData`): tensor to map over
             out (:class:`TensorData`): optional, tensor data to fill in,
                    should broadcast with `a`
@@ -126,7 +228,7 @@ class SimpleOps(TensorOps):
 
         def ret(a: Tensor, out: Optional[Tensor] = None) -> Tensor:
             if out is None:
-                out = a.zeros(a.shape)
+                out = a.zeros(a.shape, out_dtype(a.dtype))
             f(*out.tuple(), *a.tuple())
             return out
 
@@ -134,12 +236,13 @@ class SimpleOps(TensorOps):
 
     @staticmethod
     def zip(
-        fn: Callable[[float, float], float],
-    ) -> Callable[["Tensor", "Tensor"], "Tensor"]:
+        fn: Callable[[float, float], float], out_dtype: DtypeRule = storage_dtype
+    ) -> ZipProto:
         """Higher-order tensor zip function ::
 
           fn_zip = zip(fn)
           out = fn_zip(a, b)
+          fn_zip(a, b, out)
 
         Simple version ::
 
@@ -157,8 +260,12 @@ class SimpleOps(TensorOps):
         Args:
         ----
             fn: function from two floats-to-float to apply
+            out_dtype: dtype of a new output given the promoted dtype of
+                `a` and `b`
             a (:class:`TensorData`): tensor to zip over
             b (:class:`TensorData`): tensor to zip over
+            out (:class:`TensorData`): optional, tensor data to fill in,
+                   must have the broadcast shape of `a` and `b`
 
         Returns:
         -------
@@ -167,25 +274,73 @@ class SimpleOps(TensorOps):
         """
         f = tensor_zip(fn)
 
-        def ret(a: "Tensor", b: "Tensor") -> "Tensor":
+        def ret(a: "Tensor", b: "Tensor", out: Optional["Tensor"] = None) -> "Tensor":
             if a.shape != b.shape:
                 c_shape = shape_broadcast(a.shape, b.shape)
             else:
                 c_shape = a.shape
-            out = a.zeros(c_shape)
+            if out is None:
+                out = a.zeros(c_shape, out_dtype(result_dtype(a.dtype, b.dtype)))
+            else:
+                assert out.shape == c_shape, f"Cannot write {c_shape} into {out.shape}"
             f(*out.tuple(), *a.tuple(), *b.tuple())
             return out
 
         return ret
 
+    @staticmethod
+    def zip_scalar(
+        fn: Callable[[float, float], float],
+    ) -> ScalarProto:
+        """Higher-order tensor zip against a constant ::
+
+          fn_scalar = zip_scalar(fn)
+          out = fn_scalar(a, c)
+          fn_scalar(a, c, out)
+
+        Simple version ::
+
+            for i:
+                for j:
+                    out[i, j] = fn(a[i, j], c)
+
+        Equivalent to `zip(fn)` with `c` as a 1-element tensor, but runs as
+        a map with `c` passed straight to the kernel, with no broadcasting.
+
+        Args:
+        ----
+            fn: function from two floats-to-float to apply
+            a (:class:`TensorData`): tensor to map over
+            c (float): constant second argument of `fn`
+            out (:class:`TensorData`): optional, tensor data to fill in,
+                   should broadcast with `a`
+
+        Returns:
+        -------
+            :class:`TensorData` : new tensor data
+
+        """
+
+        def ret(a: Tensor, c: float, out: Optional[Tensor] = None) -> Tensor:
+            if out is None:
+                out = a.zeros(a.shape, result_dtype(a.dtype, c))
+            tensor_map(lambda x: fn(x, c))(*out.tuple(), *a.tuple())
+            return out
+
+        return ret
+
     @staticmethod
     def reduce(
-        fn: Callable[[float, float], float], start: float = 0.0
-    ) -> Callable[["Tensor", int], "Tensor"]:
+        fn: Callable[[float, float], float],
+        start: float = 0.0,
+        summation: str = "naive",
+        out_dtype: DtypeRule = storage_dtype,
+    ) -> ReduceProto:
         """Higher-order tensor reduce function. ::
 
           fn_reduce = reduce(fn)
           out = fn_reduce(a, dim)
+          fn_reduce(a, dim, out)
 
         Simple version ::
 
@@ -200,22 +355,33 @@ class SimpleOps(TensorOps):
             fn: function from two floats-to-float to apply
             a (:class:`TensorData`): tensor to reduce over
             dim (int): int of dim to reduce
+            out (:class:`TensorData`): optional, tensor data to fill in,
+                   with the shape of `a` except 1 at `dim`
             start: initial value in reduction
+            summation: accumulation scheme, see `SUMMATIONS`. Anything
+                other than "naive" requires `fn` to be `operators.add`.
+            out_dtype: dtype of a new output given the dtype of `a`,
+                e.g. `sum_dtype` to count bools
 
         Returns:
         -------
             :class:`TensorData` : new tensor
 
         """
-        f = tensor_reduce(fn)
+        check_summation(fn, summation)
+        f = tensor_reduce(fn, summation)
 
-        def ret(a: "Tensor", dim: int) -> "Tensor":
+        def ret(a: "Tensor", dim: int, out: Optional["Tensor"] = None) -> "Tensor":
             out_shape = list(a.shape)
             out_shape[dim] = 1
 
             # Other values when not sum.
-            out = a.zeros(tuple(out_shape))
-            out._tensor._storage[:] = start
+            if out is None:
+                out = a.zeros(tuple(out_shape), out_dtype(a.dtype))
+                out._tensor._storage[:] = start
+            else:
+                assert out.shape == tuple(out_shape), f"Cannot reduce into {out.shape}"
+                out.fill_(start)
 
             f(*out.tuple(), *a.tuple(), dim)
             return out
@@ -224,12 +390,83 @@ class SimpleOps(TensorOps):
 
     @staticmethod
     def matrix_multiply(a: "Tensor", b: "Tensor") -> "Tensor":
-        """Matrix multiplication"""
-        raise NotImplementedError("Not implemented in this assignment")
+        """Batched tensor matrix multiply ::
+
+            for n:
+              for i:
+                for j:
+                  for k:
+                    out[n, i, j] += a[n, i, k] * b[n, k, j]
+
+        Leading batch dimensions broadcast, and 2D inputs are treated as a
+        single batch.
+
+        Args:
+        ----
+            a : tensor data a
+            b : tensor data b
+
+        Returns:
+        -------
+            New tensor data
+
+        """
+        return _simple_matrix_multiply(a, b)
 
     is_cuda = False
 
 
+# Accumulation schemes for sums.
+#
+# * naive: fold left to right, error grows linearly with the length.
+# * pairwise: naive sums of `PAIRWISE_BLOCK` elements combined as a
+#   balanced tree, error grows with log(length).
+# * kahan: compensated summation (Neumaier's variant), error independent
+#   of the length.
+SUMMATIONS = ("naive", "pairwise", "kahan")
+PAIRWISE_BLOCK = 8
+
+
+def check_summation(fn: Callable[[float, float], float], summation: str) -> None:
+    """Check that `summation` is a known scheme that applies to `fn`."""
+    if summation not in SUMMATIONS:
+        raise ValueError(
+            f"Unknown summation {summation!r}, expected one of {SUMMATIONS}"
+        )
+    if summation != "naive" and fn is not operators.add:
+        raise ValueError(f"Summation {summation!r} only applies to operators.add")
+
+
+def pairwise_sum(acc: float, xs: List[float]) -> float:
+    """Add `xs` to `acc` by pairwise summation."""
+    partials = []
+    for i in range(0, len(xs), PAIRWISE_BLOCK):
+        s = 0.0
+        for x in xs[i : i + PAIRWISE_BLOCK]:
+            s += x
+        partials.append(s)
+    while len(partials) > 1:
+        pairs = [partials[i] + partials[i + 1] for i in range(0, len(partials) - 1, 2)]
+        if len(partials) % 2:
+            pairs.append(partials[-1])
+        partials = pairs
+    return acc + partials[0] if partials else acc
+
+
+def kahan_sum(acc: float, xs: List[float]) -> float:
+    """Add `xs` to `acc` with compensated summation."""
+    c = 0.0
+    for x in xs:
+        t = acc + x
+        # Recover the low-order bits lost when forming `t`.
+        if abs(acc) >= abs(x):
+            c += (acc - t) + x
+        else:
+            c += (x - t) + acc
+        acc = t
+    return acc + c
+
+
 # Implementations.
 
 
@@ -269,17 +506,21 @@ def tensor_map(
         in_shape: Shape,
         in_strides: Strides,
     ) -> None:
-        in_index, out_index = (
-            np.zeros(shape.shape, dtype=int) for shape in (in_shape, out_shape)
+        # Fast path: identical dense layouts, so storage positions line up one
+        # to one.
+        if (
+            len(out) == np.prod(out_shape)
+            and np.array_equal(out_shape, in_shape)
+            and np.array_equal(out_strides, in_strides)
+        ):
+            out[:] = [fn(x) for x in in_storage.tolist()]
+            return
+
+        # General path: gather through a cached plan, compute, scatter.
+        out_pos, in_pos = index_plans.positions(
+            out_shape, out_strides, (in_shape, in_strides)
         )
-
-        for i in range(len(out)):
-            to_index(i, out_shape, out_index)
-            broadcast_index(out_index, out_shape, in_shape, in_index)
-
-            out[index_to_position(out_index, out_strides)] = fn(
-                in_storage[index_to_position(in_index, in_strides)]
-            )
+        out[out_pos] = [fn(x) for x in in_storage[in_pos].tolist()]
 
     return _map
 
@@ -325,25 +566,33 @@ def tensor_zip(
         b_shape: Shape,
         b_strides: Strides,
     ) -> None:
-        a_index, b_index, out_index = (
-            np.zeros(shape.shape, dtype=int) for shape in (a_shape, b_shape, out_shape)
+        # Fast path: identical dense layouts, so storage positions line up one
+        # to one.
+        if (
+            len(out) == np.prod(out_shape)
+            and np.array_equal(out_shape, a_shape)
+            and np.array_equal(out_shape, b_shape)
+            and np.array_equal(out_strides, a_strides)
+            and np.array_equal(out_strides, b_strides)
+        ):
+            out[:] = [fn(x, y) for x, y in zip(a_storage.tolist(), b_storage.tolist())]
+            return
+
+        # General path: gather through a cached plan, compute, scatter.
+        out_pos, a_pos, b_pos = index_plans.positions(
+            out_shape, out_strides, (a_shape, a_strides), (b_shape, b_strides)
         )
-
-        for i in range(len(out)):
-            to_index(i, out_shape, out_index)
-            broadcast_index(out_index, out_shape, a_shape, a_index)
-            broadcast_index(out_index, out_shape, b_shape, b_index)
-
-            out[index_to_position(out_index, out_strides)] = fn(
-                a_storage[index_to_position(a_index, a_strides)],
-                b_storage[index_to_position(b_index, b_strides)],
-            )
+        out[out_pos] = [
+            fn(x, y)
+            for x, y in zip(a_storage[a_pos].tolist(), b_storage[b_pos].tolist())
+        ]
 
     return _zip
 
 
 def tensor_reduce(
     fn: Callable[[float, float], float],
+    summation: str = "naive",
 ) -> Callable[[Storage, Shape, Strides, Storage, Shape, Strides, int], None]:
     """Low-level implementation of tensor reduce.
 
@@ -353,12 +602,15 @@ def tensor_reduce(
     Args:
     ----
         fn: reduction function mapping two floats to float
+        summation: accumulation scheme when `fn` is `operators.add`,
+            see `SUMMATIONS`
 
     Returns:
     -------
         Tensor reduce function.
 
     """
+    fold = {"pairwise": pairwise_sum, "kahan": kahan_sum}.get(summation)
 
     def _reduce(
         out: Storage,
@@ -369,22 +621,130 @@ def tensor_reduce(
         a_strides: Strides,
         reduce_dim: int,
     ) -> None:
-        out_index = np.zeros(out_shape.shape, dtype=int)
-
-        for i in range(len(out)):
-            to_index(i, out_shape, out_index)
-            loc = index_to_position(out_index, out_strides)
+        out_pos, a_pos = index_plans.reduce_positions(
+            out_shape, out_strides, a_shape, a_strides, reduce_dim
+        )
 
-            for j in range(a_shape[reduce_dim]):
-                a_index = out_index.copy()
-                a_index[reduce_dim] = j
+        # Each output folds its row of positions, seeded with the start value
+        # already in `out` (`SimpleOps.reduce` requires one for all reductions).
+        rows = zip(out[out_pos].tolist(), a_storage[a_pos].tolist())
+        if fold is not None:
+            out[out_pos] = [fold(acc, row) for acc, row in rows]
+            return
 
-                # The line below works because `SimpleOps.reduce` requires a start value for all reductions
-                out[loc] = fn(
-                    a_storage[index_to_position(a_index, a_strides)], out[loc]
-                )
+        results = []
+        for acc, row in rows:
+            for x in row:
+                acc = fn(x, acc)
+            results.append(acc)
+        out[out_pos] = results
 
     return _reduce
 
 
+def tensor_matrix_multiply(
+    out: Storage,
+    out_shape: Shape,
+    out_strides: Strides,
+    a_storage: Storage,
+    a_shape: Shape,
+    a_strides: Strides,
+    b_storage: Storage,
+    b_shape: Shape,
+    b_strides: Strides,
+) -> None:
+    """Low-level implementation of batched matrix multiply.
+
+    * `a_shape[-1]` must equal `b_shape[-2]`
+    * the leading (batch) dimensions of `a` and `b` broadcast to those of `out`
+
+    Args:
+    ----
+        out (Storage): storage for `out` tensor
+        out_shape (Shape): shape for `out` tensor
+        out_strides (Strides): strides for `out` tensor
+        a_storage (Storage): storage for `a` tensor
+        a_shape (Shape): shape for `a` tensor
+        a_strides (Strides): strides for `a` tensor
+        b_storage (Storage): storage for `b` tensor
+        b_shape (Shape): shape for `b` tensor
+        b_strides (Strides): strides for `b` tensor
+
+    Returns:
+    -------
+        None : Fills in `out`
+
+    """
+    batch = tuple(out_shape[:-2].tolist())
+    n, m, k = int(out_shape[-2]), int(out_shape[-1]), int(a_shape[-1])
+
+    out_pos = broadcast_positions(batch + (n, m), out_shape, out_strides)
+    a_pos = broadcast_positions(batch + (n, k), a_shape, a_strides)
+    b_pos = broadcast_positions(batch + (k, m), b_shape, b_strides)
+
+    results = []
+    for a_mat, b_mat in zip(
+        a_storage[a_pos.reshape(-1, n, k)].tolist(),
+        b_storage[b_pos.reshape(-1, k, m)].tolist(),
+    ):
+        b_cols = list(zip(*b_mat))
+        for row in a_mat:
+            results.extend(sum(x * y for x, y in zip(row, col)) for col in b_cols)
+    out[out_pos] = results
+
+
+def matrix_multiply_op(
+    kernel: Callable[
+        [Storage, Shape, Strides, Storage, Shape, Strides, Storage, Shape, Strides],
+        None,
+    ],
+) -> Callable[[Tensor, Tensor], Tensor]:
+    """Wrap a low-level batched matrix multiply kernel as a tensor function.
+
+    2D inputs get a leading batch dimension of size 1 (a view, no copy) and
+    the batch dimension is dropped from the result if both inputs were 2D.
+
+    Args:
+    ----
+        kernel: low-level kernel, see `tensor_matrix_multiply`
+
+    Returns:
+    -------
+        Function multiplying two tensors.
+
+    """
+
+    def batched(t: Tensor) -> Tensor:
+        if t.dims != 2:
+            return t
+        return t._new(
+            TensorData(
+                t._tensor._storage,
+                (1, *t.shape),
+                (0, *t._tensor.strides),
+                offset=t._tensor._offset,
+            )
+        )
+
+    def ret(a: Tensor, b: Tensor) -> Tensor:
+        both_2d = a.dims == 2 and b.dims == 2
+        a, b = batched(a), batched(b)
+        assert a.shape[-1] == b.shape[-2], f"Cannot multiply {a.shape} @ {b.shape}"
+
+        ls = list(shape_broadcast(a.shape[:-2], b.shape[:-2]))
+        ls.append(a.shape[-2])
+        ls.append(b.shape[-1])
+        out = a.zeros(tuple(ls), result_dtype(a.dtype, b.dtype))
+        kernel(*out.tuple(), *a.tuple(), *b.tuple())
+
+        # Undo the batch dimension if we added it.
+        if both_2d:
+            out = out._new(TensorData(out._tensor._storage, tuple(ls[1:])))
+        return out
+
+    return ret
+
+
+_simple_matrix_multiply = matrix_multiply_op(tensor_matrix_multiply)
+
 SimpleBackend = TensorBackend(SimpleOps)
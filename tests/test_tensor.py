@@ -1,10 +1,30 @@
+from pathlib import Path
 from typing import Callable, Iterable, List, Tuple
 
+import numpy as np
 import pytest
 from hypothesis import given
 from hypothesis.strategies import DataObject, data, lists, permutations
 
-from minitorch import MathTestVariable, Tensor, grad_check, tensor
+from minitorch import (
+    SGD,
+    IndexingError,
+    MathTestVariable,
+    Parameter,
+    Tensor,
+    empty,
+    from_dlpack,
+    from_numpy,
+    full,
+    grad_check,
+    load,
+    manual_seed,
+    memmap,
+    ones,
+    rand,
+    save,
+    tensor,
+)
 
 from .strategies import assert_close, small_floats
 from .tensor_strategies import shaped_tensors, tensors
@@ -134,6 +154,32 @@ def test_fromlist() -> None:
     assert t.shape == (1, 2, 3)
 
 
+def test_fromarray() -> None:
+    """Arrays and tensors are copied into fresh row-major storage"""
+    a = np.arange(6.0).reshape(2, 3).T
+    t = tensor(a)
+    assert t.shape == (3, 2) and t._tensor.is_contiguous()
+    assert t[2, 1] == 5.0 and not np.shares_memory(t.to_numpy(), a)
+    assert tensor(t.permute(1, 0))[1, 2] == 5.0
+    with pytest.raises(ValueError):
+        tensor([[1.0], [2.0, 3.0]])
+
+
+def test_factories() -> None:
+    """Filled and random factories, seeded through a numpy Generator"""
+    assert ones((2, 3)).sum().item() == 6.0
+    assert full((2, 2), 7, dtype=np.int32)[1, 1] == 7
+    assert empty((4, 5), dtype=np.float32).shape == (4, 5)
+
+    manual_seed(3)
+    a = rand((3, 4))
+    manual_seed(3)
+    assert rand((3, 4)).is_close(a).all().item() == 1.0
+    b = rand((3, 4), generator=np.random.default_rng(3))
+    assert b.is_close(a).all().item() == 1.0
+    assert 0.0 <= a.to_numpy().min() and a.to_numpy().max() < 1.0
+
+
 def test_view() -> None:
     """Test view"""
     t = tensor([[2, 3, 4], [4, 5, 7]])
@@ -159,6 +205,30 @@ def test_back_view(t1: Tensor) -> None:
     grad_check(view, t1)
 
 
+def test_apply_metadata() -> None:
+    """Shapes, dims and orders reach `forward` as plain values, without gradients"""
+    t = tensor([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], requires_grad=True)
+    out = t.permute(1, 0).contiguous().view(6)
+    assert out.history is not None and len(out.history.inputs) == 1
+    (out * 2.0 + 1.0).sum(0).backward()
+    assert t.grad is not None
+    assert t.grad.to_numpy().tolist() == [[2.0] * 3] * 2
+
+
+def test_slots() -> None:
+    """Tensors carry no `__dict__` and histories point at the original inputs"""
+    a = tensor([1.0, 2.0], requires_grad=True)
+    b = tensor([3.0, 4.0], requires_grad=True)
+    assert not hasattr(a, "__dict__")
+    assert b.unique_id > a.unique_id
+
+    out = a * b
+    assert out.history is not None
+    assert out.history.inputs[0] is a and out.history.inputs[1] is b
+    out.sum().backward()
+    assert a.grad is not None and a.grad.to_numpy().tolist() == [3.0, 4.0]
+
+
 @pytest.mark.xfail
 def test_permute_view() -> None:
     t = tensor([[2, 3, 4], [4, 5, 7]])
@@ -184,6 +254,24 @@ def test_fromnumpy() -> None:
         assert t[ind] == t2[ind]
 
 
+def test_numpy_interchange() -> None:
+    """Tensors and ndarrays share memory in both directions."""
+    a = np.arange(6.0).reshape(2, 3)
+    t = from_numpy(a)
+    a[0, 0] = 9.0
+    assert t[0, 0] == 9.0
+
+    n = np.asarray(t.permute(1, 0))
+    assert n.shape == (3, 2) and np.shares_memory(n, a)
+    n[2, 1] = 7.0
+    assert t[1, 2] == 7.0
+
+    d = from_dlpack(t)
+    assert d._tensor._storage.base is not None and d[1, 2] == 7.0
+    assert from_numpy(np.arange(3)).dtype == np.float64
+    assert not t.broadcast_to(4, 2, 3).to_numpy().flags.writeable
+
+
 # Student Submitted Tests
 
 
@@ -225,3 +313,106 @@ def test_reduce_forward_all_dims() -> None:
     t_summed_all_expected = tensor([27])
 
     assert_close(t_summed_all[0], t_summed_all_expected[0])
+
+
+def test_sgd_in_place() -> None:
+    """SGD updates parameters and reuses gradient storage."""
+    p = Parameter(tensor([1.0, 2.0, 3.0], requires_grad=True))
+    optim = SGD([p], lr=0.5)
+    value = p.value
+
+    for _ in range(2):
+        optim.zero_grad()
+        (p.value * p.value).sum().backward()
+        optim.step()
+
+    assert p.value is value
+    assert_close(p.value[0], 0.0)
+    assert_close(p.value[2], 0.0)
+    grad = p.value.grad
+    optim.zero_grad()
+    assert p.value.grad is grad
+    assert_close(grad[1], 0.0)
+
+
+def test_slice_views() -> None:
+    """Slices, narrow and select share storage and route gradients back."""
+    t = tensor(
+        [[float(4 * i + j) for j in range(4)] for i in range(3)], requires_grad=True
+    )
+
+    rows = t[1:]
+    assert rows.shape == (2, 4)
+    assert rows._tensor._storage is t._tensor._storage
+    assert rows[0, 2] == 6.0
+    assert t[:, 1].shape == (3,)
+    assert [t[:, 1][i] for i in range(3)] == [1.0, 5.0, 9.0]
+    assert t[-1, ::2].shape == (2,)
+    assert t[-1, ::2][1] == 10.0
+    assert t[-1, -1] == 11.0
+    assert t[0, -4] == 0.0
+    with pytest.raises(IndexingError):
+        t[-4, 0]
+    assert t.narrow(1, 1, 2)[2, 0] == 9.0
+    assert t.select(0, 2)[3] == 11.0
+    assert t[1:].view(8)[7] == 11.0
+
+    (t[::2, 1:3] * 3.0).sum().backward()
+    assert t.grad is not None
+    assert t.grad[0, 1] == 3.0
+    assert t.grad[2, 2] == 3.0
+    assert t.grad[1, 1] == 0.0
+    assert t.grad[0, 0] == 0.0
+
+    t[1:2, 1:3].fill_(0.0)
+    assert t[1, 1] == 0.0
+    assert t[1, 3] == 7.0
+
+    # Writes accept the same negative indices as reads.
+    t[-1, -2] = 5.0
+    assert t[2, 2] == 5.0
+    row = t[-1]
+    row[-1] = 6.0
+    assert t[2, 3] == 6.0
+    with pytest.raises(IndexingError):
+        t[0, -5] = 1.0
+
+
+def test_broadcast_to() -> None:
+    """Broadcasting is a stride-0 view and gradients sum over it."""
+    a = tensor([[1.0], [2.0], [3.0]], requires_grad=True)
+    b = a.broadcast_to(2, 3, 4)
+    assert b.shape == (2, 3, 4)
+    assert b._tensor.strides == (0, 1, 0)
+    assert b._tensor._storage is a._tensor._storage
+    assert b[1, 2, 3] == 3.0
+
+    (b * 2.0).sum().backward()
+    assert a.grad is not None
+    assert [a.grad[i, 0] for i in range(3)] == [16.0, 16.0, 16.0]
+
+    grad = a.expand(tensor([1.0, 2.0]).view(1, 2))
+    assert grad.shape == (3, 1)
+    assert grad[0, 0] == 3.0
+
+
+def test_save_load(tmp_path: Path) -> None:
+    """Saved tensors map back in place, in row-major order."""
+    t = tensor([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+    path = str(tmp_path / "t.npy")
+    save(t.permute(1, 0), path)
+
+    loaded = load(path)
+    assert loaded.shape == (3, 2)
+    assert loaded._tensor.strides == (2, 1)
+    assert loaded[2, 0] == 3.0
+    assert (loaded * 2.0)[1, 1] == 10.0
+
+    writable = load(path, mode="r+")
+    writable.add_(loaded)
+    del writable
+    assert load(path)[2, 1] == 12.0
+
+    raw = memmap(str(tmp_path / "raw.bin"), (2, 2), mode="w+")
+    raw.fill_(7.0)
+    assert memmap(str(tmp_path / "raw.bin"), (4,))[3] == 7.0
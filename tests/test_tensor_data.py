@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from hypothesis import given
 from hypothesis.strategies import DataObject, data
@@ -57,6 +58,14 @@ def test_enumeration(tensor_data: TensorData) -> None:
             assert p >= 0 and p < tensor_data.shape[i]
 
 
+def test_enumeration_chunks() -> None:
+    """Indices are enumerated in row-major order across conversion chunks."""
+    shape = (3, minitorch.tensor_data.INDICES_CHUNK // 2 + 1)
+    tensor_data = minitorch.TensorData([0.0] * int(minitorch.prod(shape)), shape)
+    expected = [(i, j) for i in range(shape[0]) for j in range(shape[1])]
+    assert list(tensor_data.indices()) == expected
+
+
 @pytest.mark.task2_1
 @given(tensor_data())
 def test_index(tensor_data: TensorData) -> None:
@@ -67,8 +76,11 @@ def test_index(tensor_data: TensorData) -> None:
         assert pos >= 0 and pos < tensor_data.size
 
     base = [0] * tensor_data.dims
+    last = [tensor_data.shape[0] - 1] + base[1:]
+    base[0] = -1
+    assert tensor_data.index(tuple(base)) == tensor_data.index(tuple(last))
     with pytest.raises(minitorch.IndexingError):
-        base[0] = -1
+        base[0] = -tensor_data.shape[0] - 1
         tensor_data.index(tuple(base))
 
     if tensor_data.dims > 1:
@@ -123,3 +135,138 @@ def test_shape_broadcast() -> None:
 @given(tensor_data())
 def test_string(tensor_data: TensorData) -> None:
     tensor_data.to_string()
+
+
+def test_string_summarized() -> None:
+    """Large tensors print only their edge items."""
+    data = minitorch.TensorData(np.arange(20.0), (4, 5))
+    s = data.to_string(threshold=10, edgeitems=1)
+    assert s == "\n[\n\t[0.00 ... 4.00]\n\t...\n\t[15.00 ... 19.00]]"
+    assert data.to_string().count("...") == 0
+
+
+@given(tensor_data())
+def test_broadcast_positions(tensor_data: TensorData) -> None:
+    """Plan positions agree with `to_index` + `index_to_position`."""
+    out_shape = (2,) + tuple(tensor_data.shape)
+    positions = minitorch.broadcast_positions(
+        out_shape, tensor_data.shape, tensor_data.strides
+    )
+    out_index = np.zeros(len(out_shape), dtype=np.int32)
+    index = np.zeros(tensor_data.dims, dtype=np.int32)
+    for i in range(int(minitorch.prod(out_shape))):
+        minitorch.to_index(i, np.array(out_shape), out_index)
+        minitorch.broadcast_index(
+            out_index, np.array(out_shape), tensor_data._shape, index
+        )
+        assert positions[i] == minitorch.index_to_position(index, tensor_data._strides)
+
+
+@given(tensor_data())
+def test_batched_indices(tensor_data: TensorData) -> None:
+    """`to_indices` agrees with the one-at-a-time `to_index`."""
+    ordinals = np.arange(tensor_data.size)
+    indices = minitorch.to_indices(ordinals, tensor_data.shape)
+
+    index = np.zeros(tensor_data.dims, dtype=np.int32)
+    for i in ordinals:
+        minitorch.to_index(i, tensor_data._shape, index)
+        assert list(indices[i]) == list(index)
+
+
+def test_index_plan_cache() -> None:
+    """Plans are reused, counted and evicted least recently used first."""
+    cache = minitorch.IndexPlanCache(maxsize=2)
+    shape, strides = np.array([2, 3]), np.array([3, 1])
+    out_pos, in_pos = cache.positions(shape, strides, (np.array([3]), np.array([1])))
+    assert list(in_pos) == [0, 1, 2, 0, 1, 2]
+    plan_bytes = out_pos.nbytes + in_pos.nbytes
+    assert cache.info() == (0, 1, 2, 1, 1 << 28, plan_bytes)
+
+    cache.positions(shape, strides, (np.array([3]), np.array([1])))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    out_pos, a_pos = cache.reduce_positions(
+        np.array([2, 1]), np.array([1, 1]), shape, strides, 1
+    )
+    assert list(out_pos) == [0, 1]
+    assert a_pos.tolist() == [[0, 1, 2], [3, 4, 5]]
+
+    cache.positions(shape, strides, (shape, strides))
+    assert cache.info().currsize == 2
+    cache.positions(shape, strides, (np.array([3]), np.array([1])))
+    assert cache.misses == 4
+
+    cache.clear()
+    assert cache.info() == (0, 0, 2, 0, 1 << 28, 0)
+
+    # Plans past the byte cap are evicted, or not kept at all.
+    cache = minitorch.IndexPlanCache(max_bytes=plan_bytes)
+    cache.positions(shape, strides, (np.array([3]), np.array([1])))
+    cache.positions(shape, strides, (shape, strides))
+    assert cache.info()[3:] == (1, plan_bytes, plan_bytes)
+    cache.positions(np.array([4, 3]), strides, (np.array([3]), np.array([1])))
+    assert cache.info()[3:] == (1, plan_bytes, plan_bytes)
+
+
+def test_storage_pool() -> None:
+    """Buffers return to the pool only once nothing views them."""
+    pool = minitorch.StoragePool(max_bytes=1024, min_size=8, enabled=True)
+    a = pool.zeros(100)
+    view = a[10:]
+    del a
+    b = pool.zeros(100)
+    assert pool.info()[:3] == (0, 2, 0)
+
+    b[:] = 1.0
+    del b, view
+    c = pool.zeros(120)
+    assert pool.hits == 1 and len(c) == 120 and not c.any()
+    assert pool.info().hit_rate == 1 / 3
+
+    del c
+    pool.zeros(200)
+    assert pool.info().pooled_bytes == 1024
+    assert len(pool.zeros(4)) == 4 and pool.misses == 3
+
+
+def test_coalesce() -> None:
+    """Contiguous dimensions merge and loops follow the smallest strides."""
+    assert minitorch.coalesce((2, 3, 4), (12, 4, 1), (12, 4, 1)) == (
+        (24,),
+        (1,),
+        (1,),
+    )
+    # A transposed input orders the loops by the strides of both operands.
+    assert minitorch.coalesce((3, 2), (2, 1), (1, 3)) == ((2, 3), (1, 2), (3, 1))
+    # Broadcast dimensions keep stride 0 and block merging.
+    strides = minitorch.broadcast_strides((2, 3), (3,), (1,))
+    assert strides == (0, 1)
+    assert minitorch.coalesce((2, 3), (3, 1), strides) == ((2, 3), (3, 1), (0, 1))
+    assert minitorch.coalesce((1, 1), (1, 1)) == ((1,), (0,))
+
+    # Plans over a permuted tensor still pair up the same positions.
+    td = TensorData(list(range(24)), (2, 3, 4)).permute(2, 0, 1)
+    out = TensorData([0.0] * 24, td.shape)
+    out_pos, in_pos = minitorch.index_plans.positions(
+        out._shape, out._strides, (td._shape, td._strides)
+    )
+    index = np.zeros(3, dtype=np.int32)
+    for o, i in zip(out_pos, in_pos):
+        minitorch.to_index(o, out._shape, index)
+        assert td.index(tuple(index)) == i
+    assert sorted(out_pos) == list(range(24))
+
+
+def test_view_strides() -> None:
+    """Views reuse strides whenever merged dimensions are contiguous."""
+    assert minitorch.is_c_contiguous((3, 1, 5), (5, 100, 1))
+    assert not minitorch.is_c_contiguous((5, 3), (1, 5))
+    assert not TensorData([0.0] * 6, (2, 3), (1, 2)).is_contiguous()
+
+    assert minitorch.view_strides((2, 3, 4), (12, 4, 1), (6, 4)) == (4, 1)
+    assert minitorch.view_strides((1, 6), (100, 1), (2, 1, 3, 1)) == (3, 3, 1, 1)
+    # Permuted layouts can merge dimensions that stayed adjacent.
+    assert minitorch.view_strides((2, 3, 4), (1, 8, 2), (2, 12)) == (1, 2)
+    assert minitorch.view_strides((2, 3, 4), (1, 8, 2), (6, 4)) is None
+    assert minitorch.view_strides((3, 2), (1, 3), (6,)) is None
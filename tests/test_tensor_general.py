@@ -0,0 +1,487 @@
+import math
+import os
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+import pytest
+from hypothesis import given
+from hypothesis.strategies import DataObject, data, integers, lists, permutations
+
+import minitorch
+from minitorch import (
+    MathTestVariable,
+    Tensor,
+    TensorBackend,
+    fusion,
+    grad_check,
+    operators,
+    process_ops,
+)
+
+from .strategies import assert_close, small_floats
+from .tensor_strategies import assert_close_tensor, shaped_tensors, tensors
+
+one_arg, two_arg, red_arg = MathTestVariable._comp_testing()
+
+shared: Dict[str, TensorBackend] = {
+    "simple": minitorch.SimpleBackend,
+    "numpy": minitorch.NumpyBackend,
+    "fast": minitorch.FastTensorBackend,
+}
+backend_tests = list(shared)
+backend_ops = {
+    "simple": minitorch.SimpleOps,
+    "numpy": minitorch.NumpyOps,
+    "fast": minitorch.FastOps,
+}
+
+
+@given(lists(small_floats, min_size=1))
+@pytest.mark.parametrize("backend", backend_tests)
+def test_create(backend: str, t1: List[float]) -> None:
+    """Create different tensors."""
+    t2 = minitorch.tensor(t1, backend=shared[backend])
+    for i in range(len(t1)):
+        assert t1[i] == t2[i]
+
+
+@given(data())
+@pytest.mark.parametrize("fn", one_arg)
+@pytest.mark.parametrize("backend", backend_tests)
+def test_one_args(
+    fn: Tuple[str, Callable[[float], float], Callable[[Tensor], Tensor]],
+    backend: str,
+    data: DataObject,
+) -> None:
+    """Run forward for all one arg functions above."""
+    t1 = data.draw(tensors(backend=shared[backend]))
+    name, base_fn, tensor_fn = fn
+    t2 = tensor_fn(t1)
+    for ind in t2._tensor.indices():
+        assert_close(t2[ind], base_fn(t1[ind]))
+
+
+@given(data())
+@pytest.mark.parametrize("fn", two_arg)
+@pytest.mark.parametrize("backend", backend_tests)
+def test_two_args(
+    fn: Tuple[str, Callable[[float, float], float], Callable[[Tensor, Tensor], Tensor]],
+    backend: str,
+    data: DataObject,
+) -> None:
+    """Run forward for all two arg functions above."""
+    t1, t2 = data.draw(shaped_tensors(2, backend=shared[backend]))
+    name, base_fn, tensor_fn = fn
+    t3 = tensor_fn(t1, t2)
+    for ind in t3._tensor.indices():
+        assert_close(t3[ind], base_fn(t1[ind], t2[ind]))
+
+
+@given(data())
+@pytest.mark.parametrize("fn", red_arg)
+@pytest.mark.parametrize("backend", backend_tests)
+def test_reduce(
+    fn: Tuple[str, Callable[[Iterable[float]], float], Callable[[Tensor], Tensor]],
+    backend: str,
+    data: DataObject,
+) -> None:
+    """Run backward for all reduce functions above."""
+    t1 = data.draw(tensors(backend=shared[backend]))
+    name, _, tensor_fn = fn
+    grad_check(tensor_fn, t1)
+
+
+@given(data())
+@pytest.mark.parametrize("fn", one_arg)
+@pytest.mark.parametrize("backend", backend_tests)
+def test_one_derivative(
+    fn: Tuple[str, Callable[[float], float], Callable[[Tensor], Tensor]],
+    backend: str,
+    data: DataObject,
+) -> None:
+    """Run backward for all one arg functions above."""
+    t1 = data.draw(tensors(backend=shared[backend]))
+    name, _, tensor_fn = fn
+    grad_check(tensor_fn, t1)
+
+
+@given(data())
+@pytest.mark.parametrize("fn", two_arg)
+@pytest.mark.parametrize("backend", backend_tests)
+def test_two_grad_broadcast(
+    fn: Tuple[str, Callable[[float, float], float], Callable[[Tensor, Tensor], Tensor]],
+    backend: str,
+    data: DataObject,
+) -> None:
+    """Run backward for all two arg functions above with broadcast."""
+    t1, t2 = data.draw(shaped_tensors(2, backend=shared[backend]))
+    name, base_fn, tensor_fn = fn
+    grad_check(tensor_fn, t1, t2)
+
+    # broadcast check
+    grad_check(tensor_fn, t1.sum(0), t2)
+    grad_check(tensor_fn, t1, t2.sum(0))
+
+
+@given(data())
+@pytest.mark.parametrize("backend", backend_tests)
+def test_permute(backend: str, data: DataObject) -> None:
+    """Check permutations for all backends."""
+    t1 = data.draw(tensors(backend=shared[backend]))
+    permutation = data.draw(permutations(range(len(t1.shape))))
+
+    def permute(a: Tensor) -> Tensor:
+        return a.permute(*permutation)
+
+    grad_check(permute, t1)
+
+
+@given(data())
+@pytest.mark.parametrize("backend", backend_tests)
+def test_matches_simple(backend: str, data: DataObject) -> None:
+    """Every backend function gives the same values as `SimpleBackend`."""
+    t1, t2 = data.draw(shaped_tensors(2))
+    simple = minitorch.SimpleBackend
+    other = shared[backend]
+    a = Tensor(t1._tensor, backend=other)
+    b = Tensor(t2._tensor, backend=other)
+
+    for name in ("neg_map", "sigmoid_map", "relu_map", "exp_map", "id_map"):
+        np.testing.assert_allclose(
+            getattr(other, name)(a).to_numpy(),
+            getattr(simple, name)(t1).to_numpy(),
+        )
+    for name in ("add_zip", "mul_zip", "lt_zip", "eq_zip", "is_close_zip"):
+        np.testing.assert_allclose(
+            getattr(other, name)(a, b).to_numpy(),
+            getattr(simple, name)(t1, t2).to_numpy(),
+        )
+    for dim in range(len(a.shape)):
+        np.testing.assert_allclose(
+            other.add_reduce(a, dim).to_numpy(),
+            simple.add_reduce(t1, dim).to_numpy(),
+        )
+
+
+@given(data())
+@pytest.mark.parametrize("backend", backend_tests)
+def test_zip_mixed_layouts(backend: str, data: DataObject) -> None:
+    """Zip operands with the same shape but different strides."""
+    t1 = data.draw(tensors(backend=shared[backend]))
+    t2 = data.draw(tensors(backend=shared[backend], shape=t1.shape))
+    t3 = t2.contiguous()
+    a, b = t1.to_numpy(), t2.to_numpy()
+
+    np.testing.assert_allclose((t1 + t2).to_numpy(), a + b)
+    np.testing.assert_allclose((t1 * t3).to_numpy(), a * b)
+    np.testing.assert_allclose((t3 + t3).to_numpy(), b + b)
+    np.testing.assert_allclose((-t2).to_numpy(), -b)
+
+
+@pytest.mark.parametrize("summation", ["naive", "pairwise", "kahan"])
+@pytest.mark.parametrize("backend", backend_tests)
+def test_sum_summation(backend: str, summation: str) -> None:
+    """All summation schemes agree, and the compensated ones stay close."""
+    values = np.random.default_rng(0).random((50, 400)) * 0.1 + 0.1
+    be = minitorch.TensorBackend(backend_ops[backend], summation=summation)
+    t = minitorch.tensor(values.tolist(), backend=be)
+
+    np.testing.assert_allclose(t.sum(0).to_numpy()[0], values.sum(0))
+    np.testing.assert_allclose(t.sum(1).to_numpy()[:, 0], values.sum(1))
+    np.testing.assert_allclose(t.permute(1, 0).sum(0).to_numpy()[0], values.sum(1))
+
+    exact = math.fsum(values.ravel())
+    total = t.contiguous().view(values.size).sum().item()
+    if summation != "naive":
+        assert abs(total - exact) <= 1e-13 * exact
+
+
+def test_summation_checked() -> None:
+    """Unknown schemes, or schemes on anything but add, are rejected."""
+    with pytest.raises(ValueError):
+        minitorch.TensorBackend(minitorch.SimpleOps, summation="exact")
+    with pytest.raises(ValueError):
+        minitorch.SimpleOps.reduce(minitorch.operators.mul, 1.0, "kahan")
+
+
+@pytest.mark.parametrize("backend", backend_tests)
+def test_mm2(backend: str) -> None:
+    """Matrix multiply matches broadcast multiply-and-sum."""
+    a = minitorch.rand((2, 3), backend=shared[backend])
+    b = minitorch.rand((3, 4), backend=shared[backend])
+    c = a @ b
+
+    c2 = (a.view(2, 3, 1) * b.view(1, 3, 4)).sum(1).view(2, 4)
+
+    for ind in c._tensor.indices():
+        assert_close(c[ind], c2[ind])
+
+    minitorch.grad_check(lambda a, b: a @ b, a, b)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float16])
+@pytest.mark.parametrize("backend", backend_tests)
+def test_dtype_preserved(backend: str, dtype: type) -> None:
+    """Kernels, scalars and gradients keep the storage dtype."""
+    a = minitorch.rand((2, 3), backend=shared[backend], dtype=dtype, requires_grad=True)
+    b = minitorch.rand((3, 4), backend=shared[backend], dtype=dtype, requires_grad=True)
+    out = ((a @ b).sigmoid() * 2.0 + (a < 0.5).sum()).sum()
+    assert out.dtype == dtype
+    out.backward()
+    assert a.grad is not None and a.grad.dtype == dtype
+    assert b.grad is not None and b.grad.dtype == dtype
+    np.testing.assert_allclose(
+        a.exp().to_numpy(),
+        np.exp(a.to_numpy()),
+        rtol=1e-2 if dtype == np.float16 else 1e-6,
+    )
+
+    counts = minitorch.tensor([[1, 2], [3, 4]], backend=shared[backend], dtype=np.int32)
+    assert (counts + 1).dtype == np.int32
+    assert (counts * 0.5).dtype == np.float64
+    assert counts.sum(0).to_numpy().tolist() == [[4, 6]]
+
+    # Float-valued functions and sums widen instead of truncating.
+    ints = minitorch.tensor([1, 2, 3], backend=shared[backend], dtype=np.int32)
+    x = np.array([1.0, 2.0, 3.0])
+    np.testing.assert_allclose(ints.sigmoid().to_numpy(), 1.0 / (1.0 + np.exp(-x)))
+    np.testing.assert_allclose(ints.inv().to_numpy(), 1.0 / x)
+    np.testing.assert_allclose(ints.log().to_numpy(), np.log(x))
+    flags = minitorch.tensor([True] * 3, backend=shared[backend], dtype=np.bool_)
+    assert flags.sum().dtype == np.int32 and flags.sum().item() == 3
+    assert minitorch.TensorData(np.arange(6), (6,)).dtype == np.float64
+
+
+@given(data())
+@pytest.mark.parametrize("backend", backend_tests)
+def test_scalar_ops(backend: str, data: DataObject) -> None:
+    """Python numbers go through the scalar kernels and interned constants."""
+    t1 = data.draw(tensors(backend=shared[backend]))
+    a = t1.to_numpy()
+    np.testing.assert_allclose((t1 + 2.0).to_numpy(), a + 2.0)
+    np.testing.assert_allclose((3.0 - t1).to_numpy(), 3.0 - a)
+    np.testing.assert_allclose((t1 * 1.5).to_numpy(), a * 1.5)
+    np.testing.assert_allclose((t1 / 4.0).to_numpy(), a / 4.0)
+
+    t2 = t1.permute(*reversed(range(t1.dims)))
+    out = t1.f.mul_scalar(t2, -2.0)
+    np.testing.assert_allclose(out.to_numpy(), t2.to_numpy() * -2.0)
+    assert t1._ensure_tensor(1.5) is t1._ensure_tensor(1.5)
+
+    t1.requires_grad_(True)
+    ((t1 * 3.0 - 1.0) / 2.0).sum().backward()
+    assert t1.grad is not None
+    np.testing.assert_allclose(t1.grad.to_numpy(), np.full(a.shape, 1.5))
+
+
+@given(data())
+@pytest.mark.parametrize("backend", backend_tests)
+def test_bmm(backend: str, data: DataObject) -> None:
+    """Batched matrix multiply with a broadcast batch dimension."""
+    small_ints = integers(min_value=2, max_value=4)
+    A, B, C, D = (data.draw(small_ints) for _ in range(4))
+    a = data.draw(tensors(backend=shared[backend], shape=(D, A, B)))
+    b = data.draw(tensors(backend=shared[backend], shape=(B, C)))
+
+    c = a @ b
+    c2 = (
+        (a.contiguous().view(D, A, B, 1) * b.contiguous().view(1, 1, B, C))
+        .sum(2)
+        .view(D, A, C)
+    )
+    assert_close_tensor(c, c2)
+    minitorch.grad_check(lambda a, b: a @ b, a, b)
+
+
+@given(data())
+@pytest.mark.parametrize("backend", backend_tests)
+def test_inplace(backend: str, data: DataObject) -> None:
+    """In-place methods write into the existing storage."""
+    t1 = data.draw(tensors(backend=shared[backend]))
+    t2 = data.draw(tensors(backend=shared[backend], shape=t1.shape[-1:]))
+    a, b = t1.to_numpy().copy(), t2.to_numpy().copy()
+    storage = t1._tensor._storage
+
+    t1.add_(t2).mul_(2.0).sub_(t2)
+    np.testing.assert_allclose(t1.to_numpy(), (a + b) * 2.0 - b)
+    assert t1._tensor._storage is storage
+
+    view = t1.permute(*reversed(range(t1.dims)))
+    view.fill_(3.0)
+    np.testing.assert_allclose(t1.to_numpy(), np.full(a.shape, 3.0))
+
+
+@pytest.mark.parametrize("backend", backend_tests)
+def test_inplace_overlap(backend: str) -> None:
+    """In-place operands overlapping the output are read before it is written."""
+    a = np.arange(64.0 * 64.0).reshape(64, 64)
+    t = minitorch.tensor(a.tolist(), backend=shared[backend])
+    t.add_(t.permute(1, 0))
+    np.testing.assert_allclose(t.to_numpy(), a + a.T)
+    t.mul_(t.permute(1, 0))
+    np.testing.assert_allclose(t.to_numpy(), (a + a.T) ** 2)
+
+    t = minitorch.tensor(a.ravel().tolist(), backend=shared[backend])
+    t[1:].add_(t[:-1])
+    np.testing.assert_allclose(t.to_numpy()[1:], a.ravel()[1:] + a.ravel()[:-1])
+
+
+@given(data())
+@pytest.mark.parametrize("backend", backend_tests)
+def test_out(backend: str, data: DataObject) -> None:
+    """Zip and reduce fill a provided (possibly strided) `out`."""
+    t1, t2 = data.draw(shaped_tensors(2, backend=shared[backend]))
+    f = shared[backend]
+    order = list(reversed(range(t1.dims)))
+
+    out = t1.zeros(tuple(t1.shape[i] for i in order)).permute(*order)
+    assert f.mul_zip(t1, t2, out) is out
+    np.testing.assert_allclose(out.to_numpy(), t1.to_numpy() * t2.to_numpy())
+
+    out = t1.zeros((1,) + t1.shape[1:]).fill_(5.0)
+    assert f.add_reduce(t1, 0, out) is out
+    np.testing.assert_allclose(out.to_numpy(), t1.sum(0).to_numpy())
+
+
+_x, _y = fusion.arg(0), fusion.arg(1)
+_e = fusion.call(operators.exp, -_x)
+_fused = fusion.fuse(_e * (2.0 - _e) + _y, 2)
+fused_zips = {name: ops.zip(_fused) for name, ops in backend_ops.items()}
+
+
+@given(data())
+@pytest.mark.parametrize("backend", backend_tests)
+def test_fused_zip(backend: str, data: DataObject) -> None:
+    """A fused expression matches the chain of maps and zips it replaces."""
+    t1, t2 = data.draw(shaped_tensors(2, backend=shared[backend]))
+    f = shared[backend]
+
+    e_t = f.exp_map(f.neg_map(t1))
+    expected = f.add_zip(f.mul_zip(e_t, f.add_zip(t1._ensure_tensor(2.0), -e_t)), t2)
+    np.testing.assert_allclose(
+        fused_zips[backend](t1, t2).to_numpy(), expected.to_numpy()
+    )
+    np.testing.assert_allclose(
+        f.sigmoid_back_zip(t1, t2).to_numpy(),
+        (t1.sigmoid() * (1.0 - t1.sigmoid()) * t2).to_numpy(),
+    )
+
+
+lazy = {name: TensorBackend(ops, fuse=True) for name, ops in backend_ops.items()}
+
+
+@given(data())
+@pytest.mark.parametrize("backend", backend_tests)
+def test_lazy_fusion(backend: str, data: DataObject) -> None:
+    """With `fuse=True`, chains of maps and zips run as one fused kernel."""
+    e1, e2 = data.draw(shaped_tensors(2, backend=shared[backend]))
+    t1, t2 = (Tensor(t._tensor, backend=lazy[backend]) for t in (e1, e2))
+
+    loss = (t1 * t2) + (t1 - 1.0) * (t2 - 1.0)
+    out = loss.sigmoid()
+    assert fusion.pending(out)
+    expr, inputs = fusion._plan(loss._tensor)
+    assert expr is not None
+    assert {id(x._tensor) for x in inputs} == {id(t1._tensor), id(t2._tensor)}
+    expected = ((e1 * e2) + (e1 - 1.0) * (e2 - 1.0)).sigmoid()
+    assert not fusion.pending(expected)
+    np.testing.assert_allclose(out.to_numpy(), expected.to_numpy())
+    assert not fusion.pending(out)
+
+    # Writing to an input first computes the values captured from it.
+    before = t1.to_numpy().copy()
+    doubled = t1 * 2.0
+    t1.add_(1.0)
+    np.testing.assert_allclose(doubled.to_numpy(), before * 2.0)
+
+
+threaded = minitorch.TensorBackend(minitorch.NumpyOps, workers=3, threshold=1)
+
+
+@given(data())
+def test_threaded_matches_serial(data: DataObject) -> None:
+    """Chunked kernels give exactly the single-threaded results."""
+    t1, t2 = data.draw(shaped_tensors(2, backend=minitorch.NumpyBackend))
+    serial = minitorch.TensorBackend(minitorch.NumpyOps, workers=1)
+    a = Tensor(t1._tensor, backend=threaded)
+    b = Tensor(t2._tensor, backend=threaded)
+
+    for name in ("neg_map", "sigmoid_map", "exp_map"):
+        np.testing.assert_array_equal(
+            getattr(threaded, name)(a).to_numpy(),
+            getattr(serial, name)(t1).to_numpy(),
+        )
+    for name in ("add_zip", "mul_zip", "sigmoid_back_zip"):
+        np.testing.assert_array_equal(
+            getattr(threaded, name)(a, b.sum(0)).to_numpy(),
+            getattr(serial, name)(t1, t2.sum(0)).to_numpy(),
+        )
+    for dim in range(a.dims):
+        np.testing.assert_array_equal(
+            threaded.add_reduce(a, dim).to_numpy(),
+            serial.add_reduce(t1, dim).to_numpy(),
+        )
+
+
+processes = minitorch.TensorBackend(minitorch.ProcessOps, workers=2, threshold=1)
+
+
+@given(data())
+def test_process_matches_simple(data: DataObject) -> None:
+    """Kernels split across worker processes match `SimpleBackend`."""
+    t1, t2 = data.draw(shaped_tensors(2))
+    simple = minitorch.SimpleBackend
+    a = Tensor(t1._tensor, backend=processes)
+    b = Tensor(t2._tensor, backend=processes)
+
+    c = processes.add_zip(a, b)
+    np.testing.assert_array_equal(c.to_numpy(), simple.add_zip(t1, t2).to_numpy())
+    np.testing.assert_array_equal(
+        processes.sigmoid_map(c).to_numpy(),
+        simple.sigmoid_map(simple.add_zip(t1, t2)).to_numpy(),
+    )
+    np.testing.assert_array_equal(
+        processes.sigmoid_back_zip(a, b).to_numpy(),
+        simple.sigmoid_back_zip(t1, t2).to_numpy(),
+    )
+    for dim in range(a.dims):
+        np.testing.assert_array_equal(
+            processes.add_reduce(a, dim).to_numpy(),
+            simple.add_reduce(t1, dim).to_numpy(),
+        )
+
+
+def test_process_fused_scalar() -> None:
+    """Fused functions bound to a constant are rebuilt in the workers."""
+    x, y = minitorch.fusion.arg(0), minitorch.fusion.arg(1)
+    fused = minitorch.fusion.fuse(x * y + 1.0, 2)
+    t = minitorch.tensor([1.0, 2.0, 3.0], backend=processes)
+    out = minitorch.ProcessOps.zip_scalar(fused)(t, 2.0)
+    assert out.to_numpy().tolist() == [3.0, 5.0, 7.0]
+
+
+def test_process_shared_storage() -> None:
+    """Tensors of the process backend are sent to workers without copies."""
+    serial = minitorch.TensorBackend(minitorch.ProcessOps, workers=1, threshold=4)
+    made = [
+        minitorch.tensor([[1.0, 2.0], [3.0, 4.0]], backend=processes),
+        minitorch.zeros((2, 2), backend=processes),
+        minitorch.rand((2, 2), backend=processes),
+    ]
+    made.append(made[0].zeros())
+    made.append(processes.add_zip(made[0], made[2]))
+    # Below the threshold kernels fall back to `SimpleOps`.
+    made.append(serial.add_zip(*(Tensor(t._tensor, backend=serial) for t in made[:2])))
+    made.append(made[0].permute(1, 0)[1:])
+    for t in made:
+        _, copy = process_ops._spec(t)
+        assert copy is None
+
+    # Tensors below the threshold stay out of shared memory, and shared
+    # blocks keep only the descriptor of their mapping open.
+    small = minitorch.rand((3,), backend=serial)
+    assert process_ops._shared_root(small._tensor._storage) is None
+    if os.path.isdir("/proc/self/fd"):
+        before = len(os.listdir("/proc/self/fd"))
+        held = [minitorch.rand((4,), backend=serial) for _ in range(50)]
+        assert len(os.listdir("/proc/self/fd")) - before <= len(held)